@@ -0,0 +1,27 @@
+import os, sys, time, tracemalloc
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from opensearch.crawl_batch import CrawlBatch, EMBEDDING_DTYPES
+
+def benchmark(count: int = 4200, dim: int = 1536):
+    """Compare the memory of list-of-dicts items with a CrawlBatch at each embedding dtype."""
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    items = [{"e_commercesite": "pchome", "name": f"商品 {i}", "price_twd": int(rng.integers(100, 50000)),
+              "href": f"https://24h.pchome.com.tw/prod/{i}", "image_url": f"https://cs-a.ecimg.tw/{i}.jpg",
+              "keyword": "mouse", "timestamp": "2025-01-01T00:00:00", "embedding": rng.standard_normal(dim).tolist()}
+             for i in range(count)]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count} item dicts: {dict_bytes / 1e6:.1f} MB")
+    start = time.perf_counter()
+    batch = CrawlBatch.from_items(items)
+    print(f"from_items: {time.perf_counter() - start:.2f}s")
+    reference = batch.vectors()
+    for dtype in EMBEDDING_DTYPES:
+        quantized = batch.quantize(dtype)
+        error = np.abs(quantized.vectors() - reference).max()
+        print(f"CrawlBatch {dtype}: {quantized.nbytes() / 1e6:.1f} MB, max abs error {error:.4f}")
+
+if __name__ == "__main__":
+    benchmark()
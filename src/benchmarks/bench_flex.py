@@ -0,0 +1,36 @@
+import os, sys, copy, json, time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from linebot.v3.messaging import FlexContainer
+from line.flex import DEFAULT_IMAGE_URL, build_carousel
+
+def benchmark(repeat: int = 200):
+    """Compare the deepcopy + JSON round trip path with the compiled renderer at 10-30 bubbles."""
+    with open(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/flex_message.json')), encoding='utf-8') as f:
+        template = json.load(f)["product_template"]
+    product = {"name": "羅技 無線滑鼠", "href": "https://24h.pchome.com.tw/prod/X", "price_twd": 990,
+               "e_commercesite": "pchome", "image_url": "https://cs-a.ecimg.tw/x.jpg"}
+
+    def legacy(products):
+        bubbles = []
+        for p in products:
+            bubble = copy.deepcopy(template)
+            bubble["hero"]["url"] = p.get("image_url", DEFAULT_IMAGE_URL)
+            bubble["body"]["contents"][0]["text"] = p["name"]
+            bubble["body"]["contents"][0]["action"]["uri"] = p["href"]
+            bubble["body"]["contents"][1]["contents"][0]["text"] = f"NT$ {p['price_twd']}"
+            bubble["body"]["contents"][1]["contents"][1]["text"] = p["e_commercesite"].upper()
+            bubbles.append(bubble)
+        return FlexContainer.from_json(json.dumps({"type": "carousel", "contents": bubbles}, ensure_ascii=False))
+
+    for count in (10, 20, 30):
+        products = [product] * count
+        for name, build in (("deepcopy+json", legacy), ("compiled", lambda ps: build_carousel(ps, template))):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                build(products)
+            print(f"{count} bubbles {name}: {(time.perf_counter() - start) / repeat * 1000:.3f} ms per reply")
+        payload = json.dumps(build_carousel(products, template).to_dict(), ensure_ascii=False)
+        assert payload == json.dumps(legacy(products).to_dict(), ensure_ascii=False), "compiled bubbles differ from legacy output"
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,37 @@
+import os, sys, json, time, logging
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from opensearch.intent import LABELED_QUERIES_PATH, parse_intent
+
+def benchmark(use_llm: bool = False):
+    """Measure accuracy, coverage and latency of parse_intent (and optionally the chat model) on the labeled set."""
+    with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+        labeled = json.load(file)
+    results = {"rules": {"covered": 0, "correct": 0, "seconds": 0.0}}
+    if use_llm:
+        from opensearch.function import extract_intent
+        from opensearch.clients import get_openai_client
+        results["llm"] = {"covered": 0, "correct": 0, "seconds": 0.0}
+    for case in labeled:
+        start = time.perf_counter()
+        parsed = parse_intent(case["query"])
+        results["rules"]["seconds"] += time.perf_counter() - start
+        if parsed is not None:
+            results["rules"]["covered"] += 1
+            if parsed == case["expected"]:
+                results["rules"]["correct"] += 1
+            else:
+                logging.warning(f"Rule mismatch for '{case['query']}': {parsed} != {case['expected']}")
+        if use_llm:
+            start = time.perf_counter()
+            parsed = extract_intent(get_openai_client(), case["query"])
+            results["llm"]["seconds"] += time.perf_counter() - start
+            results["llm"]["covered"] += 1
+            results["llm"]["correct"] += int(parsed == case["expected"])
+    for name, result in results.items():
+        covered = result["covered"]
+        print(f"{name}: coverage {covered}/{len(labeled)}, accuracy when answering {result['correct']}/{covered}, "
+              f"avg latency {result['seconds'] / len(labeled) * 1000:.3f} ms")
+    return results
+
+if __name__ == "__main__":
+    benchmark(use_llm="--llm" in sys.argv)
@@ -0,0 +1,20 @@
+import os, sys, time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from opensearch.local_index import LOCAL_INDEX_DIR, local_index
+
+def benchmark(repeat: int = 200):
+    """Time filtered searches against the current build, e.g. after a crawl on this host."""
+    if not local_index.available():
+        print(f"No local index build under {LOCAL_INDEX_DIR}")
+        return
+    rng = np.random.default_rng(0)
+    vector = rng.standard_normal(local_index._build.vectors.shape[1]).tolist()
+    intent = {"pchome_count": 2, "ebay_count": 2, "momo_count": 2, "keyword": "mouse", "price_floor": "", "price_ceiling": 3000}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        local_index.find_k_similar_items(intent, vector, vector)
+    print(f"{len(local_index._build.meta)} documents: {(time.perf_counter() - start) / repeat * 1000:.3f} ms per 3-site search")
+
+if __name__ == "__main__":
+    benchmark()
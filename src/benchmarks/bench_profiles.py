@@ -0,0 +1,53 @@
+import os, sys, json, time
+from typing import List
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from opensearch.crawl_batch import CrawlBatch
+from opensearch.embedding import embed_texts
+from opensearch.intent import load_keyword_pairs, LABELED_QUERIES_PATH
+from opensearch.profile import EmbeddingProfile, NATIVE_DIMENSIONS
+
+BENCHMARK_PROFILES = ["float-1536", "fp16-1536", "byte-1536", "float-768", "fp16-768", "byte-768",
+                      "float-512", "fp16-512", "byte-512", "float-256", "byte-256"]
+
+def _search(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+def benchmark(profiles: List[str] = BENCHMARK_PROFILES, k: int = 6, repeat: int = 20):
+    """Recall@k, exact search latency and vector memory of each profile against full float vectors.
+
+    Products come from the latest crawl batch (CRAWL_BATCH_PATH); queries are the catalog keywords
+    in both languages plus the labeled intent queries, embedded at full size through the cache.
+    """
+    batch_path = os.getenv("CRAWL_BATCH_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/crawl_batch')))
+    batch = CrawlBatch.load(batch_path)
+    products = batch.vectors()
+    if products.shape[1] != NATIVE_DIMENSIONS:
+        print(f"Crawl batch holds {products.shape[1]}-d vectors, re-crawl with a float-{NATIVE_DIMENSIONS} profile to benchmark")
+        return
+    with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+        texts = [pair for pairs in load_keyword_pairs() for pair in pairs] + [case["query"] for case in json.load(file)]
+    vectors, _ = embed_texts(texts, dimensions=None)
+    queries = np.asarray([vector for vector in vectors if vector is not None], dtype=np.float32)
+    reference = _search(products / np.linalg.norm(products, axis=1, keepdims=True), queries, k)
+    print(f"{len(products)} products, {len(queries)} queries, recall@{k} against float-{NATIVE_DIMENSIONS}")
+    for name in profiles:
+        profile = EmbeddingProfile(name)
+        dtype = np.int8 if profile.data_type == "byte" else np.float16 if profile.data_type == "fp16" else np.float32
+        matrix = np.asarray([profile.encode(vector) for vector in products], dtype=dtype)
+        encoded_queries = np.asarray([profile.encode(vector) for vector in queries], dtype=np.float32)
+        matrix32 = matrix.astype(np.float32)
+        matrix32 /= np.linalg.norm(matrix32, axis=1, keepdims=True)
+        found = _search(matrix32, encoded_queries, k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, reference)])
+        start = time.perf_counter()
+        for _ in range(repeat):
+            _search(matrix32, encoded_queries[:1], k)
+        latency = (time.perf_counter() - start) / repeat * 1000
+        print(f"{name:>11}: recall {recall:.3f}, {latency:.3f} ms per exact query, "
+              f"{profile.bytes_per_vector() * len(products) / 1e6:.2f} MB of vectors ({profile.bytes_per_vector()} B each)")
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:] or BENCHMARK_PROFILES)
@@ -0,0 +1,18 @@
+import os, sys, json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from opensearch.intent import LABELED_QUERIES_PATH
+from opensearch.translation import Translator
+
+def benchmark():
+    """Show how the labeled queries would be translated without the remote translator."""
+    with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+        queries = [case["query"] for case in json.load(file)]
+    translator = Translator(remote=lambda text: f"<remote: {text}>")
+    for query in queries:
+        print(f"{query} -> {translator.translate(query)}")
+    for query in queries:
+        translator.translate(query)
+    print(translator.stats())
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,422 @@
+import os, re, sys, json, time, random, hashlib, logging, threading
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(level=logging.INFO)
+
+# Default round trip of each remote service in seconds, roughly what production sees from Tokyo.
+LATENCY = {"openai_embedding": 0.12, "openai_chat": 0.7, "translate": 0.06, "opensearch": 0.015, "shop": 0.15, "line": 0.04}
+CJK = re.compile(r"[㐀-鿿豈-﫿]")
+BRANDS = ["Acme", "Nova", "Orbit", "Pulse", "Zen", "Apex", "Lumen", "Vertex", "Kite", "Echo"]
+SERIES = ["Pro", "Lite", "Max", "Mini", "Plus", "Air", "Neo", "Ultra", "Go", "One"]
+COLORS = ["black", "white", "blue", "red", "grey", "green", "pink", "silver"]
+
+def _sleep(latency: Dict[str, float], service: str):
+    seconds = latency.get(service, 0.0)
+    if seconds:
+        time.sleep(seconds)
+
+def _tokens(text: str) -> List[str]:
+    # Latin words as is and Chinese as character bigrams, so related names get related vectors.
+    tokens = []
+    for word in re.findall(r"\w+", text.lower()):
+        if CJK.search(word):
+            tokens.extend(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        else:
+            tokens.append(word)
+    return tokens or [""]
+
+@lru_cache(maxsize=100000)
+def _token_vector(token: str, dimensions: int) -> np.ndarray:
+    seed = int(hashlib.sha1(token.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector summing one random vector per token, so texts sharing words are close."""
+    vector = np.sum([_token_vector(token, dimensions) for token in _tokens(text)], axis=0)
+    return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+class FakeOpenAI:
+    """The embeddings and chat completion calls of the OpenAI client, answered locally.
+
+    Chat completions return the labeled intent of a known query from data/intent_queries.json and
+    an even split across sites otherwise.
+    """
+
+    def __init__(self, latency: Dict[str, float] = LATENCY, dimensions: Optional[int] = None):
+        from opensearch.intent import LABELED_QUERIES_PATH
+        from opensearch.profile import NATIVE_DIMENSIONS
+        with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+            self.intents = {case["query"]: case["expected"] for case in json.load(file)}
+        self.latency = latency
+        self.dimensions = dimensions or NATIVE_DIMENSIONS
+        self.calls = {"embeddings": 0, "embedded_texts": 0, "chat": 0}
+        self._lock = threading.Lock()
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _embed(self, input: List[str], model: str = None, dimensions: Optional[int] = None, **kwargs):
+        _sleep(self.latency, "openai_embedding")
+        with self._lock:
+            self.calls["embeddings"] += 1
+            self.calls["embedded_texts"] += len(input)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=fake_embedding(text, dimensions or self.dimensions))
+                                     for i, text in enumerate(input)])
+
+    def _chat(self, model: str = None, messages: List[Dict] = None, **kwargs):
+        _sleep(self.latency, "openai_chat")
+        with self._lock:
+            self.calls["chat"] += 1
+        query = messages[-1]["content"]
+        intent = self.intents.get(query) or {"pchome_count": 2, "ebay_count": 2, "momo_count": 2, "keyword": "", "price_floor": "", "price_ceiling": ""}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(intent, ensure_ascii=False)))])
+
+class FakeTranslate:
+    """AWS Translate's translate_text; drops the Chinese the glossary left, which is all a benchmark needs."""
+
+    def __init__(self, latency: Dict[str, float] = LATENCY):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def translate_text(self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str, **kwargs) -> Dict:
+        _sleep(self.latency, "translate")
+        with self._lock:
+            self.calls += 1
+        return {"TranslatedText": " ".join(CJK.sub(" ", Text).split()) or "product"}
+
+class _Namespace:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+class FakeOpenSearch:
+    """In-memory indices, aliases and exact k-NN covering the OpenSearch calls this code base makes.
+
+    Queries support match (any shared token, like the standard analyzer), range, bool must and
+    match_all, and knn with a filter. Vectors are kept as float32 arrays next to each _source.
+    """
+
+    def __init__(self, latency: Dict[str, float] = LATENCY):
+        self.latency = latency
+        self._lock = threading.RLock()
+        self._indices = {}
+        self._aliases = {}
+        self.calls = {}
+        self.indices = _Namespace(exists=self._exists, create=self._create, exists_alias=self._exists_alias, get_alias=self._get_alias,
+                                  get_settings=self._get_settings, put_settings=self._put_settings, refresh=self._noop,
+                                  forcemerge=self._noop, delete=self._delete_index, update_aliases=self._update_aliases)
+        self.cluster = _Namespace(health=lambda **kwargs: {"status": "green"})
+
+    def _call(self, name: str):
+        _sleep(self.latency, "opensearch")
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _resolve(self, name: str) -> List[str]:
+        return sorted(self._aliases.get(name, ())) or ([name] if name in self._indices else [])
+
+    def _noop(self, **kwargs):
+        return {"acknowledged": True}
+
+    def _exists(self, index: str, **kwargs) -> bool:
+        return bool(self._resolve(index))
+
+    def _create(self, index: str, body: Dict = None, **kwargs):
+        self._call("indices.create")
+        with self._lock:
+            self._indices[index] = {"settings": dict((body or {}).get("settings", {}).get("index", {})), "docs": {}, "vectors": {}}
+        return {"acknowledged": True, "index": index}
+
+    def _exists_alias(self, name: str, **kwargs) -> bool:
+        return bool(self._aliases.get(name))
+
+    def _get_alias(self, name: str, **kwargs) -> Dict:
+        return {index: {"aliases": {name: {}}} for index in sorted(self._aliases.get(name, ()))}
+
+    def _get_settings(self, index: str, **kwargs) -> Dict:
+        return {name: {"settings": {"index": {"number_of_replicas": "1", **{k: str(v) for k, v in self._indices[name]["settings"].items()}}}}
+                for name in self._resolve(index)}
+
+    def _put_settings(self, index: str, body: Dict, **kwargs):
+        for name in self._resolve(index):
+            self._indices[name]["settings"].update(body.get("index", {}))
+        return {"acknowledged": True}
+
+    def _delete_index(self, index: str, ignore_unavailable: bool = False, **kwargs):
+        self._call("indices.delete")
+        with self._lock:
+            self._indices.pop(index, None)
+            for targets in self._aliases.values():
+                targets.discard(index)
+        return {"acknowledged": True}
+
+    def _update_aliases(self, body: Dict, **kwargs):
+        self._call("indices.update_aliases")
+        with self._lock:
+            for action in body["actions"]:
+                (op, spec), = action.items()
+                if op == "add":
+                    self._aliases.setdefault(spec["alias"], set()).add(spec["index"])
+                elif op == "remove":
+                    self._aliases.get(spec["alias"], set()).discard(spec["index"])
+                elif op == "remove_index":
+                    self._delete_index(spec["index"])
+        return {"acknowledged": True}
+
+    def _index_docs(self, index: str) -> Dict:
+        if index not in self._indices:
+            self._create(index)
+        return self._indices[index]
+
+    def _put(self, index: str, doc_id: str, source: Dict):
+        docs = self._index_docs(index)
+        source = dict(source)
+        vector = source.pop("embedding", None)
+        docs["docs"][doc_id] = source
+        if vector is not None:
+            docs["vectors"][doc_id] = np.asarray(vector, dtype=np.float32)
+
+    def _remove(self, index: str, doc_id: str) -> bool:
+        docs = self._indices.get(index)
+        if docs is None or doc_id not in docs["docs"]:
+            return False
+        del docs["docs"][doc_id]
+        docs["vectors"].pop(doc_id, None)
+        return True
+
+    def index(self, index: str, body: Dict, id: Optional[str] = None, **kwargs):
+        self._call("index")
+        doc_id = id or hashlib.sha1(os.urandom(8)).hexdigest()[:20]
+        with self._lock:
+            self._put(self._resolve(index)[0] if self._resolve(index) else index, doc_id, body)
+        return {"_id": doc_id, "result": "created"}
+
+    def delete(self, index: str, id: str, **kwargs):
+        self._call("delete")
+        with self._lock:
+            found = any(self._remove(name, id) for name in self._resolve(index))
+        return {"_id": id, "result": "deleted" if found else "not_found"}
+
+    def bulk(self, body: List[Dict], **kwargs) -> Dict:
+        self._call("bulk")
+        items, lines = [], iter(body)
+        with self._lock:
+            for action in lines:
+                (op, meta), = action.items()
+                index = (self._resolve(meta["_index"]) or [meta["_index"]])[0]
+                doc_id = meta.get("_id") or hashlib.sha1(os.urandom(8)).hexdigest()[:20]
+                status = 200
+                if op in ("index", "create"):
+                    status = 200 if doc_id in self._index_docs(index)["docs"] else 201
+                    self._put(index, doc_id, next(lines))
+                elif op == "update":
+                    fields = next(lines)["doc"]
+                    if doc_id in self._index_docs(index)["docs"]:
+                        self._indices[index]["docs"][doc_id].update(fields)
+                    else:
+                        status = 404
+                elif op == "delete":
+                    status = 200 if self._remove(index, doc_id) else 404
+                items.append({op: {"_index": index, "_id": doc_id, "status": status}})
+        return {"errors": any(item[next(iter(item))]["status"] >= 300 for item in items), "items": items}
+
+    def _matches(self, source: Dict, query: Dict) -> bool:
+        (kind, spec), = query.items()
+        if kind == "match_all":
+            return True
+        if kind == "bool":
+            return all(self._matches(source, clause) for clause in spec.get("must", []) + spec.get("filter", []))
+        if kind == "match":
+            (field, value), = spec.items()
+            value = value["query"] if isinstance(value, dict) else value
+            return bool(set(_tokens(str(value))) & set(_tokens(str(source.get(field, "")))))
+        if kind == "range":
+            (field, bounds), = spec.items()
+            value = source.get(field)
+            if value is None:
+                return False
+            return all({"gte": value >= bound, "gt": value > bound, "lte": value <= bound, "lt": value < bound}[op]
+                       for op, bound in bounds.items() if op in ("gte", "gt", "lte", "lt"))
+        raise ValueError(f"Unsupported query clause '{kind}'")
+
+    def _hits(self, index: str, body: Dict, size: Optional[int]) -> List[Dict]:
+        body = body or {}
+        query = body.get("query", {"match_all": {}})
+        size = body.get("size", size or 10)
+        fields = body.get("_source")
+        with self._lock:
+            candidates = [(name, doc_id, source) for name in self._resolve(index)
+                          for doc_id, source in self._indices[name]["docs"].items()]
+            if "knn" in query:
+                (field, knn), = query["knn"].items()
+                candidates = [c for c in candidates if self._matches(c[2], knn.get("filter", {"match_all": {}}))
+                              and c[1] in self._indices[c[0]]["vectors"]]
+                scored = []
+                if candidates:
+                    matrix = np.stack([self._indices[name]["vectors"][doc_id] for name, doc_id, _ in candidates])
+                    vector = np.asarray(knn["vector"], dtype=np.float32)
+                    scores = matrix @ vector / ((np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)) + 1e-12)
+                    order = np.argsort(-scores, kind="stable")[:min(size, knn.get("k", size))]
+                    scored = [(candidates[i], float(scores[i])) for i in order]
+            else:
+                scored = [(c, 1.0) for c in candidates if self._matches(c[2], query)][:size]
+            hits = []
+            for (name, doc_id, source), score in scored:
+                document = dict(source)
+                if doc_id in self._indices[name]["vectors"]:
+                    document["embedding"] = self._indices[name]["vectors"][doc_id].tolist()
+                if fields is not None:
+                    document = {key: value for key, value in document.items() if key in fields}
+                hits.append({"_index": name, "_id": doc_id, "_score": score, "_source": document})
+        return hits
+
+    def search(self, body: Dict = None, index: str = "products", scroll: Optional[str] = None, size: Optional[int] = None, **kwargs) -> Dict:
+        self._call("search")
+        hits = self._hits(index, body, size if not scroll else sys.maxsize)
+        response = {"_shards": {"total": 1, "successful": 1, "skipped": 0}, "hits": {"total": {"value": len(hits)}, "hits": hits}}
+        if scroll:
+            # Every hit comes in the first page, so the scroll that follows is always empty.
+            response["_scroll_id"] = "fake-scroll"
+        return response
+
+    def scroll(self, body: Dict = None, **kwargs) -> Dict:
+        return {"_scroll_id": None, "_shards": {"total": 1, "successful": 1, "skipped": 0}, "hits": {"hits": []}}
+
+    def clear_scroll(self, **kwargs):
+        return {"succeeded": True}
+
+    def msearch(self, body: List[Dict], **kwargs) -> Dict:
+        self._call("msearch")
+        responses = []
+        for header, query in zip(body[::2], body[1::2]):
+            hits = self._hits(header.get("index", "products"), query, None)
+            responses.append({"hits": {"total": {"value": len(hits)}, "hits": hits}, "status": 200})
+        return {"responses": responses}
+
+    def count(self, index: str = "products", body: Dict = None, **kwargs) -> Dict:
+        self._call("count")
+        return {"count": len(self._hits(index, {"query": (body or {}).get("query", {"match_all": {}}), "size": sys.maxsize, "_source": []}, None))}
+
+    def delete_by_query(self, index: str, body: Dict, **kwargs) -> Dict:
+        self._call("delete_by_query")
+        with self._lock:
+            hits = self._hits(index, {"query": body["query"], "size": sys.maxsize, "_source": []}, None)
+            for hit in hits:
+                self._remove(hit["_index"], hit["_id"])
+        return {"deleted": len(hits)}
+
+class _Response:
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} from fake shop", response=self)
+
+class FakeShopSession:
+    """A requests session serving generated PChome JSON and momo/eBay search HTML in the live page formats.
+
+    Pages are built from a seed per (site, keyword, page), so every run scrapes the same products
+    through the real parsers; pages past `pages` come back empty, like the end of a search.
+    """
+
+    def __init__(self, latency: Dict[str, float] = LATENCY, per_page: int = 20, pages: int = 5, seed: int = 0):
+        self.latency = latency
+        self.per_page = per_page
+        self.pages = pages
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _products(self, site: str, keyword: str, page: int) -> List[Dict]:
+        if page > self.pages:
+            return []
+        rng = random.Random(f"{self.seed}:{site}:{keyword}:{page}")
+        products = []
+        for i in range(self.per_page):
+            number = (page - 1) * self.per_page + i
+            name = f"{keyword} {rng.choice(BRANDS)} {rng.choice(SERIES)} {rng.randint(100, 999)} {rng.choice(COLORS)}"
+            products.append({"id": f"{site}-{hashlib.sha1(f'{keyword}:{number}'.encode()).hexdigest()[:10]}", "name": name,
+                             "price": rng.randint(150, 40000)})
+        return products
+
+    def get(self, url: str, params: Dict = None, timeout=None, headers=None, **kwargs) -> _Response:
+        _sleep(self.latency, "shop")
+        with self._lock:
+            self.requests += 1
+        params = params or {}
+        if "pchome" in url:
+            page = int(params.get("page", 1))
+            prods = [{"Id": p["id"], "name": p["name"], "price": p["price"], "picB": f"{p['id']}.jpg"}
+                     for p in self._products("pchome", params["q"], page)]
+            return _Response(200, json.dumps({"totalPage": self.pages, "prods": prods}, ensure_ascii=False))
+        if "momo" in url:
+            cards = "".join(f'<li class="listAreaLi"><a class="goods-img-url" href="/goods/GoodsDetail.jsp?i_code={p["id"]}">'
+                            f'<img class="prdImg" src="https://img.momoshop.com.tw/{p["id"]}.jpg"></a>'
+                            f'<h3 class="prdNameTitle">{p["name"]}</h3><span class="price"><b>{p["price"]:,}</b></span></li>'
+                            for p in self._products("momo", params["keyword"], int(params.get("curPage", 1))))
+            return _Response(200, f'<html><body><ul class="listArea">{cards}</ul></body></html>')
+        if "ebay" in url:
+            cards = "".join(f'<li class="s-item"><div class="s-item__wrapper"><div class="s-item__image-wrapper image-treatment">'
+                            f'<img src="https://i.ebayimg.com/{p["id"]}.jpg"></div>'
+                            f'<a class="s-item__link" href="https://www.ebay.com/itm/{p["id"]}"><div class="s-item__title">{p["name"]}</div></a>'
+                            f'<span class="s-item__price">NT${p["price"]:,}.00</span></div></li>'
+                            for p in self._products("ebay", params["_nkw"], int(params.get("_pgn", 1))))
+            return _Response(200, f'<html><body><ul class="srp-results">{cards}</ul></body></html>')
+        return _Response(404, "")
+
+class FakeLineServer:
+    """Local HTTP server standing in for the LINE Messaging API, recording when each reply token is answered."""
+
+    def __init__(self, latency: Dict[str, float] = LATENCY):
+        self.latency = latency
+        self.replies = {}
+        self._condition = threading.Condition()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                _sleep(server.latency, "line")
+                messages = body.get("messages", [])
+                with server._condition:
+                    server.replies[body.get("replyToken")] = (time.perf_counter(), messages)
+                    server._condition.notify_all()
+                response = json.dumps({"sentMessages": [{"id": str(i), "quoteToken": f"quote-{i}"} for i in range(len(messages))]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def wait(self, reply_token: str, timeout: float = 60.0):
+        """Return (arrival time, messages) of the reply for reply_token, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while reply_token not in self.replies:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self.replies[reply_token]
+
+    def close(self):
+        self._server.shutdown()
@@ -0,0 +1,244 @@
+import os, sys, json, time, base64, hashlib, hmac, logging, argparse, tempfile, threading, contextlib
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ("crawl", "store", "callback")
+LINE_SECRET = "benchmark-secret"
+
+def percentiles(samples: List[float]) -> Dict:
+    """Throughput-independent latency summary in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 2),
+            **{f"p{q}_ms": round(float(np.percentile(ms, q)), 2) for q in (50, 95, 99)}, "max_ms": round(float(ms.max()), 2)}
+
+def drive(fn: Callable[[int], None], requests: int, concurrency: int) -> Dict:
+    """Call fn(i) for every request on concurrency threads, returning throughput and latency percentiles."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"requests": requests, "concurrency": concurrency, "errors": len(errors), "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0, **percentiles(latencies),
+            **({"first_error": errors[0]} if errors else {})}
+
+def configure(args) -> str:
+    """Point every on-disk artifact at a scratch directory and size the pools before the modules read their env."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix="line-bot-bench-")
+    defaults = {
+        "OPENAI_API_KEY": "benchmark", "OPENAI_EMBEDDING_MODEL": "text-embedding-3-small", "OPENAI_CHAT_MODEL": "benchmark-chat",
+        "LINE_TOKEN": "benchmark", "LINE_SECRET": LINE_SECRET, "START_SCHEDULER": "0",
+        "DEDUPE_SNAPSHOT_PATH": os.path.join(workdir, "dedupe_snapshot.npz"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "QUERY_CACHE_PATH": os.path.join(workdir, "query_cache.sqlite3"),
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"),
+        "CRAWL_BATCH_PATH": os.path.join(workdir, "crawl_batch"),
+        "CRAWL_REPORT_DIR": os.path.join(workdir, "crawl_reports"),
+        "CRAWL_MAX_WORKERS": str(args.concurrency),
+        "WEBHOOK_WORKERS": str(args.concurrency),
+        "WEBHOOK_QUEUE_SIZE": str(max(100, args.requests)),
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    os.makedirs(os.environ["LOCAL_INDEX_DIR"], exist_ok=True)
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    return workdir
+
+def install_fakes(latency: Dict[str, float], args):
+    """Route the OpenAI, Translate and OpenSearch clients and the shops' HTTP session to the local stand-ins."""
+    from benchmarks.fakes import FakeOpenAI, FakeTranslate, FakeOpenSearch, FakeShopSession
+    from opensearch.clients import registry
+    import src.scrapers.http_session as http_session
+    import src.scrapers.scheduler as scheduler
+    fakes = {"openai": FakeOpenAI(latency), "translate": FakeTranslate(latency), "opensearch": FakeOpenSearch(latency),
+             "shop": FakeShopSession(latency, per_page=args.per_page, pages=args.pages)}
+    for name in ("openai", "translate", "opensearch"):
+        registry.install(name, fakes[name])
+    # PChome and the momo and eBay HTML fetchers all share this session.
+    http_session._session = fakes["shop"]
+    # The generated pages need no politeness delay; the shop latency stands in for page load time.
+    for site in scheduler.SITE_POLITENESS_DELAY:
+        scheduler.SITE_POLITENESS_DELAY[site] = 0.0
+    return fakes
+
+def _keyword_pairs(args):
+    from opensearch.intent import load_keyword_pairs
+    return load_keyword_pairs()[:args.keywords] if args.keywords else load_keyword_pairs()
+
+def bench_crawl(args, fakes) -> Dict:
+    """Full run_crawler passes: the first against empty caches and snapshot, the rest incremental."""
+    import scrapers.main as main
+    pairs = _keyword_pairs(args)
+    main.load_keyword_pairs = lambda: pairs
+    runs = []
+    for run in range(args.crawls):
+        start = time.perf_counter()
+        report = main.run_crawler()
+        elapsed = time.perf_counter() - start
+        totals = report["totals"]
+        runs.append({"run": run, "status": report["status"], "elapsed_sec": round(elapsed, 3), "items": totals["items"],
+                     "new": totals["new"], "unchanged": totals["unchanged"], "items_per_sec": round(totals["items"] / elapsed, 2),
+                     "embedding_items_per_sec": totals["embedding_items_per_sec"], "write_docs_per_sec": totals["write_docs_per_sec"],
+                     "scrape_job": percentiles([job["scrape_sec"] for job in report["jobs"]])})
+    return {"keywords": len(pairs), "concurrency": args.concurrency, "runs": runs}
+
+def _store_items(args) -> List[Dict]:
+    from datetime import datetime
+    from benchmarks.fakes import fake_embedding
+    from opensearch.profile import NATIVE_DIMENSIONS
+    from src.scrapers.pchome import scrape_pchome
+    items = []
+    for en_keyword, zh_keyword in _keyword_pairs(args):
+        items.extend(scrape_pchome(en_keyword, zh_keyword))
+        if len(items) >= args.requests:
+            break
+    now = datetime.now().isoformat()
+    return [{**item, "embedding": fake_embedding(item["name"], NATIVE_DIMENSIONS), "timestamp": now} for item in items[:args.requests]]
+
+class _NoSleepTime:
+    """The time module with sleep as a no-op, to patch into a single module under test."""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+def bench_store(args, fakes) -> Dict:
+    """store_and_replace_items_from_opensearch one item per call, then the same items through the bulk path."""
+    from opensearch import function
+    from opensearch.crawl_batch import CrawlBatch
+    items = _store_items(args)
+    function.create_index_for_opensearch("bench-store")
+    # The per-item path sleeps 0.5s per document against rate limits; --no-store-sleep measures it without,
+    # patching only the time module that function.py sees.
+    with mock.patch.object(function, "time", _NoSleepTime()) if args.no_store_sleep else contextlib.nullcontext():
+        per_item = drive(lambda i: function.store_and_replace_items_from_opensearch([items[i]], index_name="bench-store"), len(items), args.concurrency)
+    function.create_index_for_opensearch("bench-bulk")
+    batch = CrawlBatch.from_items(items)
+    start = time.perf_counter()
+    reports = function.bulk_store_and_replace_items_from_opensearch(batch, index_name="bench-bulk", replaced_ids=None)
+    elapsed = time.perf_counter() - start
+    stored = sum(report["succeeded"] for report in reports)
+    return {"per_item": per_item, "bulk": {"items": len(items), "stored": stored, "elapsed_sec": round(elapsed, 3),
+                                           "throughput_per_sec": round(stored / elapsed, 2) if elapsed > 0 else 0.0}}
+
+def _webhook(text: str, reply_token: str) -> str:
+    return json.dumps({"destination": "benchmark", "events": [{
+        "type": "message", "mode": "active", "timestamp": int(time.time() * 1000), "webhookEventId": reply_token,
+        "deliveryContext": {"isRedelivery": False}, "replyToken": reply_token,
+        "source": {"type": "user", "userId": "Ubenchmark"},
+        "message": {"id": reply_token, "type": "text", "quoteToken": reply_token, "text": text}}]}, ensure_ascii=False)
+
+def bench_callback(args, fakes) -> Dict:
+    """POST signed text webhooks to the Flask callback and time both the 200 and the reply reaching LINE."""
+    from benchmarks.fakes import FakeLineServer
+    from opensearch.intent import LABELED_QUERIES_PATH
+    from opensearch.local_index import local_index
+    server = FakeLineServer(fakes["latency"])
+    os.environ["LINE_API_HOST"] = server.url
+    from line import app as line_app
+    if not local_index.available():
+        import scrapers.main as main
+        pairs = _keyword_pairs(args)
+        main.load_keyword_pairs = lambda: pairs
+        main.run_crawler()
+    with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+        queries = [case["query"] for case in json.load(file)] + [zh for _, zh in _keyword_pairs(args)]
+    client = line_app.app.test_client()
+    acks, replies = [], []
+    lock = threading.Lock()
+
+    def one(i):
+        token = f"reply-{i}"
+        body = _webhook(queries[i % len(queries)], token)
+        signature = base64.b64encode(hmac.new(LINE_SECRET.encode(), body.encode(), hashlib.sha256).digest()).decode()
+        start = time.perf_counter()
+        response = client.post("/", data=body, headers={"X-Line-Signature": signature, "Content-Type": "application/json"})
+        acked = time.perf_counter()
+        if response.status_code != 200:
+            raise RuntimeError(f"callback answered {response.status_code}")
+        reply = server.wait(token)
+        if reply is None:
+            raise RuntimeError(f"no reply for {token}")
+        with lock:
+            acks.append(acked - start)
+            replies.append(reply[0] - start)
+
+    result = drive(one, args.requests, args.concurrency)
+    server.close()
+    fallbacks = sum(1 for _, messages in server.replies.values() if messages and messages[0].get("type") == "text")
+    return {**result, "ack": percentiles(acks), "reply": percentiles(replies), "text_replies": fallbacks,
+            "queries": len(queries), "webhook_queue": line_app.webhook_queue.stats() if line_app.webhook_queue else None}
+
+def failures(results: Dict) -> List[str]:
+    """Scenario outcomes that make the run exit non-zero: failed crawls and requests that errored."""
+    found = [f"crawl run {run['run']}: {run['status']}" for run in results.get("crawl", {}).get("runs", []) if run["status"] != "succeeded"]
+    store = results.get("store")
+    if store and (store["per_item"]["errors"] or store["bulk"]["stored"] < store["bulk"]["items"]):
+        found.append(f"store: {store['per_item']['errors']} per-item errors, {store['bulk']['stored']}/{store['bulk']['items']} bulk stored")
+    callback = results.get("callback")
+    if callback and callback["errors"]:
+        found.append(f"callback: {callback['errors']} errors, first: {callback.get('first_error')}")
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark crawl ingest, item storage and the LINE callback against local stand-ins.")
+    parser.add_argument("scenarios", nargs="*", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads for store/callback, crawl and webhook workers")
+    parser.add_argument("--requests", type=int, default=200, help="callback webhooks and stored items")
+    parser.add_argument("--crawls", type=int, default=2, help="run_crawler passes; the first is cold")
+    parser.add_argument("--keywords", type=int, default=0, help="limit the catalog keywords, 0 for all")
+    parser.add_argument("--pages", type=int, default=5, help="result pages each fake shop serves per keyword")
+    parser.add_argument("--per-page", type=int, default=20, help="products per fake result page")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier on the simulated remote latencies, 0 for none")
+    parser.add_argument("--no-store-sleep", action="store_true", help="skip the 0.5s per-item sleep of the per-item store path")
+    parser.add_argument("--workdir", help="directory for caches, snapshots and indexes (default: a new temp dir)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the INFO logs of the code under test")
+    args = parser.parse_args(argv)
+    scenarios = SCENARIOS if "all" in args.scenarios else list(dict.fromkeys(args.scenarios))
+    workdir = configure(args)
+    from benchmarks.fakes import LATENCY
+    latency = {service: seconds * args.latency_scale for service, seconds in LATENCY.items()}
+    fakes = install_fakes(latency, args)
+    fakes["latency"] = latency
+    results = {"workdir": workdir, "latency": latency}
+    for scenario in scenarios:
+        start = time.perf_counter()
+        results[scenario] = {"crawl": bench_crawl, "store": bench_store, "callback": bench_callback}[scenario](args, fakes)
+        print(f"{scenario} ({time.perf_counter() - start:.1f}s): {json.dumps(results[scenario], ensure_ascii=False)}")
+    results["failures"] = failures(results)
+    results["remote_calls"] = {"openai": fakes["openai"].calls, "translate": fakes["translate"].calls,
+                               "opensearch": fakes["opensearch"].calls, "shop_requests": fakes["shop"].requests}
+    print(f"remote calls: {json.dumps(results['remote_calls'])}")
+    for failure in results["failures"]:
+        print(f"FAILED {failure}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+    return results
+
+if __name__ == "__main__":
+    sys.exit(1 if main()["failures"] else 0)
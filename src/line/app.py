@@ -1,11 +1,11 @@
-import os, logging, json, copy, sys, boto3, atexit
+import os, logging, json, sys, atexit
 from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from apscheduler.schedulers.background import BackgroundScheduler
 from typing import Dict
 from pathlib import Path
-from flask import Flask, request, abort
+from flask import Flask, Response, request, abort
 from dotenv import load_dotenv
 from linebot.v3 import WebhookHandler 
 from linebot.v3.webhooks import MessageEvent, TextMessageContent, FollowEvent
@@ -13,6 +13,12 @@ from linebot.v3.messaging import FlexMessage, ReplyMessageRequest, Configuration
 from opensearchpy.exceptions import TransportError
 from linebot.v3.exceptions import InvalidSignatureError
 from opensearch.function import refresh_aws_auth, search_top_k_similar_items_from_opensearch
+from opensearch.clients import get_translate_client, registry
+from opensearch.query_cache import query_cache
+from opensearch.translation import Translator
+from opensearch.tracing import histogram, span, start_trace
+from line.webhook_queue import WebhookQueue
+from line.flex import build_carousel
 from apscheduler.schedulers.background import BackgroundScheduler
 from scrapers.main import run_crawler
 from pytz import timezone
@@ -32,53 +38,50 @@ def start_scheduler():
     scheduler.start()
     atexit.register(lambda: scheduler.shutdown())
 
-configuration = Configuration(access_token=os.getenv('LINE_TOKEN'))
+# LINE_API_HOST overrides the Messaging API base url, e.g. to reply to a local stand-in.
+configuration = Configuration(host=os.getenv('LINE_API_HOST'), access_token=os.getenv('LINE_TOKEN'))
 handler = WebhookHandler(os.getenv('LINE_SECRET'))
 
-def translate_text(text, source_lang='zh', target_lang='en'):
-    """Translate text using AWS Translate."""
-    try:
-        translate = boto3.client('translate', region_name='ap-northeast-1')
+def remote_translate_text(text, source_lang='zh', target_lang='en'):
+    """Translate text using AWS Translate, raising on failure."""
+    translate = get_translate_client()
+    with span("translate.remote"):
         response = translate.translate_text(
             Text=text,
             SourceLanguageCode=source_lang,
             TargetLanguageCode=target_lang
         )
-        translated_text = response['TranslatedText']
-        logging.info(f"Translated '{text}' to '{translated_text}'")
-        return translated_text
+    translated_text = response['TranslatedText']
+    logging.info(f"Translated '{text}' to '{translated_text}'")
+    return translated_text
+
+translator = Translator(remote_translate_text)
+
+def translate_text(text, source_lang='zh', target_lang='en'):
+    """Translate text through the glossary and translation cache, using AWS Translate only for what they miss."""
+    if (source_lang, target_lang) == ('zh', 'en'):
+        with span("translate"):
+            return translator.translate(text)
+    try:
+        return remote_translate_text(text, source_lang, target_lang)
     except Exception as e:
         logging.error(f"Translation failed for '{text}': {e}")
         return text
 
-def build_bubble(product: Dict, template: Dict) -> Dict:
-    """Build a Flex Message bubble for a product."""
-    try:
-        bubble = copy.deepcopy(template)
-        bubble["hero"]["url"] = product.get("image_url", "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcQsI1LNctDqWA1iEu24tUcfbiWZKqabrF7moQ&s")
-        bubble["body"]["contents"][0]["text"] = product["name"]
-        bubble["body"]["contents"][0]["action"]["uri"] = product["href"]
-        bubble["body"]["contents"][1]["contents"][0]["text"] = f"NT$ {product['price_twd']}"
-        bubble["body"]["contents"][1]["contents"][1]["text"] = product["e_commercesite"].upper()
-        return bubble
-    except KeyError as e:
-        logging.error(f"Missing key in product data: {e}")
-        raise
-
 def build_flex_message(user_input: str, template: Dict) -> FlexMessage:
     """Build a Flex Message carousel from search results."""
     try:
-        translated_input = translate_text(user_input, source_lang='zh', target_lang='en')
-        products = search_top_k_similar_items_from_opensearch(en_userprompt=translated_input, zh_userprompt=user_input)
-        bubbles = [bubble for product in products if (bubble := build_bubble(product, template))]
-        if not bubbles:
+        with span("search"):
+            products = search_top_k_similar_items_from_opensearch(en_userprompt=None, zh_userprompt=user_input, translate=translate_text)
+        if not products:
             logging.info(f"No products found for user input: {user_input}")
             return TextMessage(text="搜尋不到符合要求的商品")
-        logging.info(f"Found {len(bubbles)} products for user input: {user_input}")
-        bubble_msg = {"type": "carousel", "contents": bubbles}
+        with span("flex.render", products=len(products)):
+            carousel = build_carousel(products, template)
+        logging.info(f"Found {len(products)} products for user input: {user_input}")
         return FlexMessage(
             alt_text="Search Results",
-            contents=FlexContainer.from_json(json.dumps(bubble_msg, ensure_ascii=False))
+            contents=carousel
         )
     except TransportError as e:
         if e.status_code == 504 or e.status_code == 503 or e.status_code == 502:
@@ -92,18 +95,57 @@ def build_flex_message(user_input: str, template: Dict) -> FlexMessage:
         logging.error(f"Failed to build Flex Message for input '{user_input}': {str(e)}")
         return TextMessage(text="搜尋商品時發生資料庫錯誤，請稍後再試")
 
+def process_webhook(body: str, signature: str):
+    """Dispatch a webhook body to the registered event handlers."""
+    try:
+        with span("webhook.dispatch"):
+            handler.handle(body, signature)
+    except InvalidSignatureError:
+        app.logger.info("Invalid signature. Please check your channel access token/channel secret.")
+        raise
+
+WEBHOOK_ASYNC = os.getenv("WEBHOOK_ASYNC", "1") == "1"
+webhook_queue = WebhookQueue(process_webhook) if WEBHOOK_ASYNC else None
+
 @app.route("/", methods=['POST'])
 def callback():
-    """Handle LINE webhook callbacks.""" 
+    """Handle LINE webhook callbacks.
+
+    In async mode the signature is verified here, the body is queued for the worker pool and LINE
+    gets its 200 right away; a full queue answers 503 so LINE redelivers later.
+    """ 
     signature = request.headers['X-Line-Signature']
     body = request.get_data(as_text=True)
-    app.logger.info("Request body: " + body)
-    try:
-        handler.handle(body, signature)
-    except InvalidSignatureError:
-        app.logger.info("Invalid signature. Please check your channel access token/channel secret.")
-        abort(400)
-    return 'OK'
+    # Bodies carry user messages, so they are only logged when debugging.
+    app.logger.debug("Request body: " + body)
+    with start_trace("callback", bytes=len(body)):
+        if webhook_queue is None:
+            try:
+                process_webhook(body, signature)
+            except InvalidSignatureError:
+                abort(400)
+            return 'OK'
+        if not handler.parser.signature_validator.validate(body, signature):
+            app.logger.info("Invalid signature. Please check your channel access token/channel secret.")
+            abort(400)
+        if not webhook_queue.submit(body, signature):
+            abort(503)
+        return 'OK'
+
+@app.route("/stats", methods=['GET'])
+def stats():
+    """Report webhook queue, query cache and client pool metrics."""
+    return {
+        "webhook_queue": webhook_queue.stats() if webhook_queue else None,
+        "query_cache": query_cache.stats(),
+        "translation": translator.stats(),
+        "clients": registry.pool_stats(),
+    }
+
+@app.route("/metrics", methods=['GET'])
+def metrics():
+    """Per-stage latency histograms of this worker process in the Prometheus text format."""
+    return Response(histogram.render(), mimetype="text/plain; version=0.0.4")
 
 with open("./data/flex_message.json", encoding='utf-8') as f:
     flex_msg = json.load(f)
@@ -116,12 +158,13 @@ def handle_follow(event):
         line_bot_api = MessagingApi(api_client)
         bubble_string = json.dumps(welcome_msg, ensure_ascii=False)
         message = FlexMessage(alt_text="Welcome!", contents=FlexContainer.from_json(bubble_string))
-        line_bot_api.reply_message(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[message]
+        with span("line.reply"):
+            line_bot_api.reply_message(
+                ReplyMessageRequest(
+                    reply_token=event.reply_token,
+                    messages=[message]
+                )
             )
-        )
 
 @handler.add(MessageEvent, message=TextMessageContent)
 def handle_message(event):
@@ -134,25 +177,29 @@ def handle_message(event):
             message = build_flex_message(user_input, flex_msg["product_template"])
             if isinstance(message, FlexMessage) and not message.contents.to_dict().get("contents"):
                 raise ValueError("FlexMessage contents is empty")
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[message]
+            with span("line.reply"):
+                line_bot_api.reply_message(
+                    ReplyMessageRequest(
+                        reply_token=event.reply_token,
+                        messages=[message]
+                    )
                 )
-            )
         except Exception as e:
             logging.error(f"Failed to reply message: {str(e)}")
             line_bot_api = MessagingApi(api_client)
             message = TextMessage(text="搜尋失敗，請稍後再試")
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[message] 
+            with span("line.reply", fallback=True):
+                line_bot_api.reply_message(
+                    ReplyMessageRequest(
+                        reply_token=event.reply_token,
+                        messages=[message] 
+                    )
                 )
-            )
 
 
 # if __name__ == "__main__":
     # start_scheduler()
     # app.run(host="0.0.0.0", port=5000, debug=False)  # Use port 5000 for Flask app
-start_scheduler()
+# Off for processes that only import the app, such as the offline benchmarks.
+if os.getenv("START_SCHEDULER", "1") == "1":
+    start_scheduler()
@@ -0,0 +1,73 @@
+import logging
+from typing import Any, Dict, List
+from linebot.v3.messaging import FlexContainer, FlexBubble, FlexCarousel
+
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_IMAGE_URL = "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcQsI1LNctDqWA1iEu24tUcfbiWZKqabrF7moQ&s"
+# Where each product field lands in data/flex_message.json's product_template.
+PRODUCT_SLOTS = {
+    "hero_url": ("hero", "url"),
+    "name": ("body", "contents", 0, "text"),
+    "uri": ("body", "contents", 0, "action", "uri"),
+    "price": ("body", "contents", 1, "contents", 0, "text"),
+    "site": ("body", "contents", 1, "contents", 1, "text"),
+}
+
+class CompiledBubble:
+    """Render a bubble template by copying only the objects on the slot paths.
+
+    The template is parsed into a FlexBubble model once; each product bubble is a shallow copy
+    of the models along the slot paths, with everything else shared with the template, so no
+    per-product deepcopy, JSON serialization or validation is needed.
+    """
+
+    def __init__(self, template: Dict, slots: Dict[str, tuple] = PRODUCT_SLOTS):
+        self.template = template
+        self.model = FlexContainer.from_dict(template)
+        self._tree = {}
+        for slot, path in slots.items():
+            node = self._tree
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = slot
+        # Fail at startup rather than per message if the template no longer has these slots.
+        self.render({slot: "" for slot in slots})
+
+    @classmethod
+    def _render(cls, node: Any, tree: Dict, values: Dict) -> Any:
+        if isinstance(node, list):
+            rendered = list(node)
+            for index, sub_tree in tree.items():
+                rendered[index] = values[sub_tree] if isinstance(sub_tree, str) else cls._render(node[index], sub_tree, values)
+            return rendered
+        return node.copy(update={
+            name: values[sub_tree] if isinstance(sub_tree, str) else cls._render(getattr(node, name), sub_tree, values)
+            for name, sub_tree in tree.items()
+        })
+
+    def render(self, values: Dict) -> FlexBubble:
+        return self._render(self.model, self._tree, values)
+
+    def render_product(self, product: Dict) -> FlexBubble:
+        return self.render({
+            "hero_url": product.get("image_url") or DEFAULT_IMAGE_URL,
+            "name": product["name"],
+            "uri": product["href"],
+            "price": f"NT$ {product['price_twd']}",
+            "site": product["e_commercesite"].upper(),
+        })
+
+_compiled = {}
+
+def compile_bubble(template: Dict) -> CompiledBubble:
+    """Return the compiled renderer for a template, compiling it on first use."""
+    compiled = _compiled.get(id(template))
+    if compiled is None or compiled.template is not template:
+        compiled = _compiled[id(template)] = CompiledBubble(template)
+    return compiled
+
+def build_carousel(products: List[Dict], template: Dict) -> FlexCarousel:
+    """Build the carousel from compiled bubbles; it is serialized once, when the reply is sent."""
+    compiled = compile_bubble(template)
+    return FlexCarousel(contents=[compiled.render_product(product) for product in products])
@@ -0,0 +1,72 @@
+import os, logging, time, queue, threading
+from typing import Callable, Dict
+from opensearch.tracing import start_trace, observe
+
+logging.basicConfig(level=logging.INFO)
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+# LINE reply tokens expire shortly after delivery, so work that waited longer than this is dropped.
+WEBHOOK_MAX_WAIT_SEC = float(os.getenv("WEBHOOK_MAX_WAIT_SEC", "50"))
+
+class WebhookQueue:
+    """Bounded queue of verified webhook bodies processed by a fixed pool of worker threads."""
+
+    def __init__(self, process: Callable[[str, str], None], workers: int = WEBHOOK_WORKERS,
+                 maxsize: int = WEBHOOK_QUEUE_SIZE, max_wait: float = WEBHOOK_MAX_WAIT_SEC):
+        self.process = process
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "processed": 0, "failed": 0, "rejected_full": 0, "dropped_stale": 0,
+                       "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+        self._workers = [threading.Thread(target=self._run, name=f"webhook-{i}", daemon=True) for i in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, body: str, signature: str) -> bool:
+        """Enqueue without blocking; False means the queue is full and the caller should push back."""
+        try:
+            self._queue.put_nowait((time.monotonic(), body, signature))
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected_full"] += 1
+            logging.warning(f"Webhook queue full ({self._queue.maxsize}), rejecting delivery")
+            return False
+        with self._lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def _run(self):
+        while True:
+            enqueued_at, body, signature = self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            with self._lock:
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            try:
+                if wait > self.max_wait:
+                    logging.warning(f"Dropping webhook that waited {wait:.1f}s, its reply token has likely expired")
+                    with self._lock:
+                        self._stats["dropped_stale"] += 1
+                    continue
+                with start_trace("webhook"):
+                    observe("webhook.queue_wait", wait)
+                    self.process(body, signature)
+                with self._lock:
+                    self._stats["processed"] += 1
+            except Exception as e:
+                logging.error(f"Webhook processing failed: {str(e)}")
+                with self._lock:
+                    self._stats["failed"] += 1
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        started = stats["processed"] + stats["failed"] + stats["dropped_stale"]
+        stats["depth"] = self._queue.qsize()
+        stats["capacity"] = self._queue.maxsize
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / started if started else 0.0
+        return stats
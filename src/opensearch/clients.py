@@ -0,0 +1,122 @@
+import os, logging, threading, boto3
+from typing import Dict
+from botocore.config import Config
+from openai import OpenAI
+from opensearchpy import OpenSearch, RequestsHttpConnection
+from requests_aws4auth import AWS4Auth
+
+logging.basicConfig(level=logging.INFO)
+
+AWS_REGION = 'ap-northeast-1'
+OPENSEARCH_POOL_MAXSIZE = int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "20"))
+TRANSLATE_POOL_MAXSIZE = int(os.getenv("TRANSLATE_POOL_MAXSIZE", "20"))
+
+class ClientRegistry:
+    """Long-lived OpenAI, Translate and OpenSearch clients shared by every thread of a process.
+
+    Clients are created lazily and keyed to the creating pid, so each gunicorn worker builds its
+    own after fork instead of inheriting sockets from the master.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = None
+        self._clients = {}
+        self.created = {"openai": 0, "translate": 0, "opensearch": 0}
+        self.auth_refreshes = 0
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._clients = {}
+
+    def openai(self) -> OpenAI:
+        with self._lock:
+            self._check_pid()
+            if "openai" not in self._clients:
+                # The client keeps its own keep-alive connection pool, so one per process is enough.
+                self._clients["openai"] = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+                self.created["openai"] += 1
+            return self._clients["openai"]
+
+    def translate(self):
+        with self._lock:
+            self._check_pid()
+            if "translate" not in self._clients:
+                self._clients["translate"] = boto3.session.Session().client(
+                    'translate', region_name=AWS_REGION, config=Config(max_pool_connections=TRANSLATE_POOL_MAXSIZE)
+                )
+                self.created["translate"] += 1
+            return self._clients["translate"]
+
+    def install(self, name: str, client):
+        """Use client for this process instead of building one, e.g. the offline stand-ins of src/benchmarks."""
+        with self._lock:
+            self._check_pid()
+            self._clients[name] = client
+
+    @staticmethod
+    def _aws_auth() -> AWS4Auth:
+        # Refreshable credentials renew themselves before expiry, e.g. on an EC2 instance role.
+        credentials = boto3.Session().get_credentials()
+        return AWS4Auth(region=AWS_REGION, service='es', refreshable_credentials=credentials)
+
+    def opensearch(self) -> OpenSearch:
+        with self._lock:
+            self._check_pid()
+            if "opensearch" not in self._clients:
+                self._clients["opensearch"] = OpenSearch(
+                    hosts=[{'host': os.getenv("OpenSearch_Domain"), 'port': 443}],
+                    http_auth=self._aws_auth(),
+                    use_ssl=True,
+                    verify_certs=True,
+                    connection_class=RequestsHttpConnection,
+                    pool_maxsize=OPENSEARCH_POOL_MAXSIZE,
+                    timeout=20,
+                )
+                self.created["opensearch"] += 1
+            return self._clients["opensearch"]
+
+    def refresh_aws_auth(self) -> OpenSearch:
+        """Swap fresh AWS credentials into the existing OpenSearch connections, keeping their warm pools."""
+        with self._lock:
+            self._check_pid()
+            client = self._clients.get("opensearch")
+            if client is None:
+                return self.opensearch()
+            auth = self._aws_auth()
+            for connection in client.transport.connection_pool.connections:
+                connection.session.auth = auth
+            self.auth_refreshes += 1
+            return client
+
+    def pool_stats(self) -> Dict:
+        """Connection pool usage, for sizing OPENSEARCH_POOL_MAXSIZE and TRANSLATE_POOL_MAXSIZE."""
+        with self._lock:
+            stats = {"pid": self._pid, "created": dict(self.created), "auth_refreshes": self.auth_refreshes, "opensearch_pools": []}
+            client = self._clients.get("opensearch")
+            if client is not None:
+                for connection in client.transport.connection_pool.connections:
+                    for adapter in connection.session.adapters.values():
+                        for key in list(adapter.poolmanager.pools.keys()):
+                            pool = adapter.poolmanager.pools[key]
+                            stats["opensearch_pools"].append({
+                                "host": pool.host,
+                                "maxsize": pool.pool.maxsize if pool.pool else 0,
+                                "idle": pool.pool.qsize() if pool.pool else 0,
+                                "connections_opened": pool.num_connections,
+                                "requests": pool.num_requests,
+                            })
+            stats["translate_maxsize"] = TRANSLATE_POOL_MAXSIZE
+            return stats
+
+registry = ClientRegistry()
+
+def get_openai_client() -> OpenAI:
+    return registry.openai()
+
+def get_translate_client():
+    return registry.translate()
+
+def get_opensearch_client() -> OpenSearch:
+    return registry.opensearch()
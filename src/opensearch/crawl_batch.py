@@ -0,0 +1,155 @@
+import os, shutil, logging
+from typing import Dict, List, Optional
+import numpy as np
+from opensearch.incremental import product_id, content_hash
+
+logging.basicConfig(level=logging.INFO)
+
+# Column name (shared with the dedupe snapshot) -> (item field, dtype).
+FIELDS = {
+    "ids": ("id", str),
+    "sites": ("e_commercesite", str),
+    "keywords": ("keyword", str),
+    "names": ("name", str),
+    "prices": ("price_twd", np.int64),
+    "hrefs": ("href", str),
+    "image_urls": ("image_url", str),
+    "timestamps": ("timestamp", str),
+    "content_hashes": ("content_hash", str),
+}
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+class CrawlBatch:
+    """Crawled items as numpy columns plus one contiguous embedding matrix.
+
+    Replaces lists of item dicts between scraping, embedding, dedupe and storage, so a crawl holds
+    one float32 row per product instead of 1536 boxed Python floats. Embeddings may be stored as
+    float16, or int8 with a per-row scale; vectors() always returns float32.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], embeddings: Optional[np.ndarray] = None, scales: Optional[np.ndarray] = None):
+        self.columns = columns
+        self.embeddings = embeddings
+        self.scales = scales
+
+    @classmethod
+    def from_items(cls, items: List[Dict], timestamp: Optional[str] = None) -> "CrawlBatch":
+        """Build a batch from scraper dicts, assigning stable ids and content hashes."""
+        columns = {}
+        for name, (field, dtype) in FIELDS.items():
+            if name == "ids":
+                values = [item.get("id") or product_id(item) for item in items]
+            elif name == "content_hashes":
+                values = [item.get("content_hash") or content_hash(item) for item in items]
+            elif name == "timestamps" and timestamp is not None:
+                values = [timestamp] * len(items)
+            else:
+                values = [item.get(field) or ("" if dtype is str else 0) for item in items]
+            columns[name] = np.asarray(values, dtype=dtype)
+        embeddings = None
+        if items and all(item.get("embedding") is not None for item in items):
+            embeddings = np.asarray([item["embedding"] for item in items], dtype=np.float32)
+        return cls(columns, embeddings)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, np.ndarray]) -> "CrawlBatch":
+        """The documents a dedupe snapshot mirrors, skipping rows stored before it carried display fields."""
+        rows = (snapshot["hrefs"] != "") & (snapshot["prices"] >= 0)
+        return cls({name: snapshot[name][rows] for name in FIELDS}, np.asarray(snapshot["embeddings"][rows], dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.columns["ids"])
+
+    def select(self, rows) -> "CrawlBatch":
+        """Return the rows given by a boolean mask or index array, keeping their order."""
+        return CrawlBatch({name: column[rows] for name, column in self.columns.items()},
+                          self.embeddings[rows] if self.embeddings is not None else None,
+                          self.scales[rows] if self.scales is not None else None)
+
+    @classmethod
+    def concat(cls, batches: List["CrawlBatch"]) -> "CrawlBatch":
+        batches = [batch for batch in batches if len(batch)] or batches[:1]
+        if len(batches) == 1:
+            return batches[0]
+        columns = {name: np.concatenate([batch.columns[name] for batch in batches]) for name in FIELDS}
+        embeddings = None
+        if all(batch.embeddings is not None for batch in batches):
+            embeddings = np.concatenate([batch.vectors() for batch in batches])
+        return cls(columns, embeddings)
+
+    def vectors(self) -> np.ndarray:
+        """Embeddings as a float32 matrix, dequantized when stored as int8."""
+        if self.embeddings is None:
+            raise ValueError("Batch has no embeddings")
+        if self.scales is not None:
+            return self.embeddings.astype(np.float32) * self.scales[:, None]
+        return np.asarray(self.embeddings, dtype=np.float32)
+
+    def vector(self, row: int) -> np.ndarray:
+        vector = self.embeddings[row].astype(np.float32)
+        return vector * self.scales[row] if self.scales is not None else vector
+
+    def quantize(self, dtype: str = "float16") -> "CrawlBatch":
+        """Return a copy with embeddings stored as float32, float16 or symmetric per-row int8."""
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {EMBEDDING_DTYPES}")
+        vectors = self.vectors()
+        if dtype != "int8":
+            return CrawlBatch(self.columns, vectors.astype(dtype))
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return CrawlBatch(self.columns, np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32))
+
+    def item(self, row: int) -> Dict:
+        """One row as the item dict the rest of the code base expects, without its embedding."""
+        item = {field: self.columns[name][row].item() for name, (field, _) in FIELDS.items()}
+        item["image_url"] = item["image_url"] or None
+        return item
+
+    def document(self, row: int) -> Dict:
+        """One row as an OpenSearch document; the embedding is only boxed into a list here."""
+        item = self.item(row)
+        return {
+            "e_commercesite": item["e_commercesite"],
+            "name": item["name"],
+            "price_twd": item["price_twd"],
+            "href": item["href"],
+            "image_url": item["image_url"],
+            "embedding": self.vector(row).tolist(),
+            "keyword": item["keyword"],
+            "timestamp": item["timestamp"],
+        }
+
+    def groups(self) -> Dict[tuple, np.ndarray]:
+        """Row indices per (keyword, e_commercesite), in order of first appearance."""
+        groups = {}
+        for row, key in enumerate(zip(self.columns["keywords"].tolist(), self.columns["sites"].tolist())):
+            groups.setdefault(key, []).append(row)
+        return {key: np.asarray(rows) for key, rows in groups.items()}
+
+    def nbytes(self) -> int:
+        total = sum(column.nbytes for column in self.columns.values())
+        return total + sum(array.nbytes for array in (self.embeddings, self.scales) if array is not None)
+
+    def save(self, path: str):
+        """Write one .npy per column into a directory, replacing any previous batch at path."""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, column in self.columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), column)
+        if self.embeddings is not None:
+            np.save(os.path.join(tmp_path, "embeddings.npy"), self.embeddings)
+        if self.scales is not None:
+            np.save(os.path.join(tmp_path, "scales.npy"), self.scales)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        logging.info(f"Saved crawl batch of {len(self)} items ({self.nbytes() / 1e6:.1f} MB) to {path}")
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "CrawlBatch":
+        """Map a saved batch; with the default mmap_mode nothing is read until a column is used."""
+        def load_column(name):
+            file = os.path.join(path, f"{name}.npy")
+            return np.load(file, mmap_mode=mmap_mode) if os.path.exists(file) else None
+        return cls({name: load_column(name) for name in FIELDS}, load_column("embeddings"), load_column("scales"))
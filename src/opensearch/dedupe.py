@@ -0,0 +1,104 @@
+import os, logging
+from typing import List, Dict, Optional, Tuple
+from collections import defaultdict
+import numpy as np
+from opensearch.profile import EMBEDDING_PROFILE
+
+logging.basicConfig(level=logging.INFO)
+
+SIMILARITY_THRESHOLD = 0.95
+SNAPSHOT_PATH = os.getenv("DEDUPE_SNAPSHOT_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/dedupe_snapshot.npz')))
+
+def _normalized_matrix(vectors) -> np.ndarray:
+    """Stack vectors into a row-normalized float32 matrix."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, np.ndarray]]:
+    """Load the vectors of the documents currently in the index, or None when no snapshot exists yet."""
+    if not os.path.exists(path):
+        logging.info(f"No dedupe snapshot at {path}")
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        snapshot = {name: data[name] for name in data.files}
+    for name in ("content_hashes", "names", "hrefs", "image_urls"):
+        if name not in snapshot:
+            snapshot[name] = np.full(len(snapshot["ids"]), "", dtype=str)
+    if "prices" not in snapshot:
+        snapshot["prices"] = np.full(len(snapshot["ids"]), -1, dtype=np.int64)
+    if snapshot["embeddings"].ndim == 2 and len(snapshot["ids"]) and snapshot["embeddings"].shape[1] != EMBEDDING_PROFILE.dimensions:
+        logging.warning(f"Dedupe snapshot holds {snapshot['embeddings'].shape[1]}-d vectors but the embedding profile is "
+                        f"{EMBEDDING_PROFILE.name}, ignoring it until the index is rebuilt")
+        return None
+    logging.info(f"Loaded dedupe snapshot with {len(snapshot['ids'])} documents")
+    return snapshot
+
+def save_snapshot(snapshot: Dict[str, np.ndarray], path: str = SNAPSHOT_PATH):
+    """Atomically write the snapshot so a crashed crawl never leaves a truncated file."""
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **snapshot)
+    os.replace(tmp_path, path)
+    logging.info(f"Saved dedupe snapshot with {len(snapshot['ids'])} documents to {path}")
+
+def _dedupe_group(matrix: np.ndarray, threshold: float) -> np.ndarray:
+    """Return a keep-mask that drops every row too similar to an earlier kept row."""
+    similarities = np.triu(matrix @ matrix.T, k=1) > threshold
+    keep = np.ones(len(matrix), dtype=bool)
+    for i in range(len(matrix)):
+        if keep[i]:
+            keep[similarities[i]] = False
+    return keep
+
+def dedupe_items(batch, snapshot: Optional[Dict[str, np.ndarray]] = None,
+                 threshold: float = SIMILARITY_THRESHOLD, exclude_ids: Optional[set] = None) -> Tuple:
+    """Drop near-duplicates within each (keyword, e_commercesite) group of a CrawlBatch and find snapshot documents they replace.
+
+    Rows are kept in scrape order, so the first of a duplicate pair survives. Snapshot documents
+    in exclude_ids (products seen again in this crawl) are never replaced.
+    """
+    snapshot_groups = defaultdict(list)
+    exclude_ids = exclude_ids or set()
+    if snapshot is not None:
+        for row, (doc_id, keyword, site) in enumerate(zip(snapshot["ids"].tolist(), snapshot["keywords"].tolist(), snapshot["sites"].tolist())):
+            if doc_id not in exclude_ids:
+                snapshot_groups[(keyword, site)].append(row)
+
+    keep_all = np.zeros(len(batch), dtype=bool)
+    replaced_ids = []
+    vectors = batch.vectors() if len(batch) else None
+    for key, rows in batch.groups().items():
+        matrix = _normalized_matrix(vectors[rows])
+        keep = _dedupe_group(matrix, threshold)
+        keep_all[rows[keep]] = True
+        replaced_count = 0
+        previous_rows = snapshot_groups.get(key)
+        if previous_rows:
+            previous = _normalized_matrix(snapshot["embeddings"][previous_rows])
+            replaced = np.any(matrix[keep] @ previous.T > threshold, axis=0)
+            replaced_ids.extend(snapshot["ids"][previous_rows][replaced].tolist())
+            replaced_count = int(replaced.sum())
+        logging.info(f"{key[0]}/{key[1]}: kept {int(keep.sum())}/{len(rows)} items, replacing {replaced_count} previous documents")
+    survivors = batch.select(keep_all)
+    logging.info(f"Dedupe kept {len(survivors)}/{len(batch)} items and replaces {len(replaced_ids)} indexed documents")
+    return survivors, replaced_ids
+
+def update_snapshot(snapshot: Optional[Dict[str, np.ndarray]], stored, removed_ids: List[str]) -> Dict[str, np.ndarray]:
+    """Mirror the index after ingest: drop removed and rewritten documents, then append the stored CrawlBatch.
+
+    Outdated rows are kept so that incremental.expire_items can find them and delete them from the index.
+    """
+    if snapshot is not None and len(snapshot["ids"]):
+        dropped_ids = np.concatenate([np.asarray(list(removed_ids), dtype=str), stored.columns["ids"]])
+        retained = ~np.isin(snapshot["ids"], dropped_ids)
+        previous = {name: column[retained] for name, column in snapshot.items()}
+    else:
+        previous = None
+    if not len(stored):
+        return previous
+    # The snapshot shares the CrawlBatch column names; the displayed fields let the local vector index serve searches from it alone.
+    new = {**stored.columns, "embeddings": stored.vectors()}
+    if previous is None or not len(previous["ids"]):
+        return new
+    return {name: np.concatenate([previous[name], new[name]]) for name in new}
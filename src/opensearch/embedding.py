@@ -0,0 +1,216 @@
+import os, logging, time, sqlite3, hashlib, threading, unicodedata
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from openai import APIConnectionError, APIStatusError, RateLimitError
+from opensearch.clients import get_openai_client
+from opensearch.profile import EMBEDDING_PROFILE
+from opensearch.tracing import span, bind
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+# A query embedding blocks a reply, so it gives up much sooner than a crawl batch.
+QUERY_EMBEDDING_MAX_RETRIES = int(os.getenv("QUERY_EMBEDDING_MAX_RETRIES", "2"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/embedding_cache.sqlite3')))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys: NFKC, collapsed whitespace, trimmed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (normalized text, model), storing float32 vectors with LRU eviction."""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str], model: str) -> List[Optional[List[float]]]:
+        """Return cached vectors for texts (None where missing) and bump their recency."""
+        keys = [self.make_key(text, model) for text in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            results = [np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], model: str):
+        """Store vectors as float32 blobs, then evict least recently used rows over the limits."""
+        now = time.time()
+        rows = [(self.make_key(text, model), model, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for text, vector in zip(texts, vectors) if vector is not None]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        avg_bytes = total_bytes / count if count else 1
+        keep = int(min(self.max_entries, self.max_bytes / avg_bytes))
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (count - keep,)
+        )
+        logging.info(f"Evicted {count - keep} entries from embedding cache")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries, "bytes": total_bytes}
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None when EMBEDDING_CACHE_PATH is empty."""
+    global _embedding_cache
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
+
+def _retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, dropped connections and 5xx responses; auth and request errors fail the same way again."""
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+def _embed_batch(openai_client, batch: List[str], model: str, max_retries: int, dimensions: Optional[int] = None,
+                 stage: str = "embedding") -> Tuple[Optional[List[List[float]]], float]:
+    """Embed one batch with exponential backoff, timing each attempt as the given span stage; returns (vectors or None, latency)."""
+    start = time.perf_counter()
+    for attempt in range(max_retries):
+        try:
+            with span(stage, texts=len(batch), attempt=attempt + 1):
+                response = openai_client.embeddings.create(input=batch, model=model, **({"dimensions": dimensions} if dimensions else {}))
+            vectors = [row.embedding for row in sorted(response.data, key=lambda row: row.index)]
+            return vectors, time.perf_counter() - start
+        except Exception as e:
+            if not _retryable(e) or attempt == max_retries - 1:
+                logging.error(f"Embedding batch of {len(batch)} failed on attempt {attempt + 1}/{max_retries}: {e}")
+                break
+            delay = min(2 ** attempt, 30)
+            logging.warning(f"Embedding batch of {len(batch)} failed on attempt {attempt + 1}: {e}, retrying in {delay}s")
+            time.sleep(delay)
+    return None, time.perf_counter() - start
+
+def embed_texts(texts: List[str], openai_client=None, model: str = None, batch_size: int = EMBEDDING_BATCH_SIZE,
+                max_concurrency: int = EMBEDDING_MAX_CONCURRENCY, max_retries: int = EMBEDDING_MAX_RETRIES,
+                cache: Optional[EmbeddingCache] = None, use_cache: bool = True,
+                dimensions: Optional[int] = EMBEDDING_PROFILE.request_dimensions, stage: str = "embedding") -> Tuple[List[Optional[List[float]]], Dict]:
+    """Embed texts in batches with bounded concurrency; failed batches leave None in their slots.
+
+    dimensions shortens the vectors on the API side and defaults to the EMBEDDING_PROFILE size.
+    stage names the span the API calls are timed under, so crawls don't skew the query latencies.
+    """
+    # The OpenAI client honours OPENAI_BASE_URL, so a local stub endpoint can stand in for the real API.
+    openai_client = openai_client or get_openai_client()
+    model = model or os.getenv("OPENAI_EMBEDDING_MODEL")
+    cache = cache or (get_embedding_cache() if use_cache else None)
+    # Shortened vectors are cached apart from the full-size ones of the same text.
+    cache_model = f"{model}:{dimensions}" if dimensions else model
+    results: List[Optional[List[float]]] = cache.get_many(texts, cache_model) if cache else [None] * len(texts)
+    # Only distinct normalized texts that missed the cache go to the API.
+    pending: Dict[str, List[int]] = {}
+    for i, (text, vector) in enumerate(zip(texts, results)):
+        if vector is None:
+            pending.setdefault(normalize_text(text), []).append(i)
+    missing = [texts[indices[0]] for indices in pending.values()]
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    latencies = []
+    failed_batches = 0
+    start = time.perf_counter()
+    if len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            futures = [executor.submit(bind(_embed_batch), openai_client, batch, model, max_retries, dimensions, stage) for batch in batches]
+            outcomes = [future.result() for future in futures]
+    else:
+        # A single batch, which is every query embedding, runs on the calling thread instead of a pool of its own.
+        outcomes = [_embed_batch(openai_client, batch, model, max_retries, dimensions, stage) for batch in batches]
+    for batch, (vectors, latency) in zip(batches, outcomes):
+        latencies.append(latency)
+        if vectors is None:
+            failed_batches += 1
+            continue
+        if cache:
+            cache.put_many(batch, vectors, cache_model)
+        for text, vector in zip(batch, vectors):
+            for i in pending[normalize_text(text)]:
+                results[i] = vector
+    elapsed = time.perf_counter() - start
+    embedded = sum(1 for vector in results if vector is not None)
+    stats = {
+        "items": len(texts),
+        "embedded": embedded,
+        "cache_hits": len(texts) - sum(len(indices) for indices in pending.values()),
+        "api_texts": len(missing),
+        "batches": len(batches),
+        "failed_batches": failed_batches,
+        "elapsed_sec": elapsed,
+        "items_per_sec": embedded / elapsed if elapsed > 0 else 0.0,
+        "batch_latency_avg_sec": sum(latencies) / len(latencies) if latencies else 0.0,
+        "batch_latency_max_sec": max(latencies, default=0.0),
+    }
+    logging.info(f"Embedded {embedded}/{len(texts)} texts ({stats['cache_hits']} cached, {len(missing)} via API in {len(batches)} batches, "
+                 f"{stats['items_per_sec']:.1f} items/sec, avg batch latency {stats['batch_latency_avg_sec']:.2f}s)")
+    return results, stats
+
+def embed_text(text: str, openai_client=None, model: str = None, max_retries: int = QUERY_EMBEDDING_MAX_RETRIES) -> List[float]:
+    """Embed a single query text through the cache, raising if the API call ultimately fails."""
+    vectors, _ = embed_texts([text], openai_client=openai_client, model=model, max_retries=max_retries)
+    if vectors[0] is None:
+        raise RuntimeError(f"Failed to create embedding for '{text}'")
+    return vectors[0]
+
+def embed_items(batch, openai_client=None, **kwargs):
+    """Embed the names of a CrawlBatch, returning the rows that got embeddings (as one float32 matrix) and the run stats."""
+    kwargs.setdefault("stage", "crawl.embedding")
+    vectors, stats = embed_texts(batch.columns["names"].tolist(), openai_client=openai_client, **kwargs)
+    embedded = np.asarray([vector is not None for vector in vectors], dtype=bool)
+    for name, ok in zip(batch.columns["names"].tolist(), embedded):
+        if not ok:
+            logging.warning(f"Skipping item without embedding: {name}")
+    embedded_batch = batch.select(embedded)
+    if embedded.any():
+        embedded_batch.embeddings = np.asarray([vector for vector in vectors if vector is not None], dtype=np.float32)
+    return embedded_batch, stats
@@ -1,66 +1,116 @@
-import os, logging, time, boto3, json
-from typing import List, Dict
+import os, logging, time, json, threading
+from typing import List, Dict, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
 from opensearchpy.exceptions import TransportError
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
+from opensearchpy import helpers
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from pathlib import Path
 import numpy as np
+from opensearch.embedding import embed_text
+from opensearch.clients import registry, get_openai_client, get_opensearch_client
+from opensearch.query_cache import query_cache
+from opensearch.intent import parse_intent
+from opensearch.dedupe import SIMILARITY_THRESHOLD, _normalized_matrix
+from opensearch.local_index import local_index
+from opensearch.profile import EMBEDDING_PROFILE
+from opensearch.tracing import span, bind
 logging.basicConfig(level=logging.INFO)
-# Initialize OpenSearch client
 env_path = Path(__file__).resolve().parent.parent.parent / '.env' 
 load_dotenv(dotenv_path=env_path, override=True)
 PROMPT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/system_prompt.txt'))
-aws_auth = None
-opensearch_client = None
 with open(PROMPT_PATH, 'r') as file:
     system_prompt = file.read()
+BULK_CHUNK_SIZE = int(os.getenv("OPENSEARCH_BULK_CHUNK_SIZE", "200"))
+BULK_CONCURRENCY = int(os.getenv("OPENSEARCH_BULK_CONCURRENCY", "2"))
+BULK_MAX_RETRIES = int(os.getenv("OPENSEARCH_BULK_MAX_RETRIES", "5"))
+# Replicas for a rebuilt index when there is no previous index to copy the count from.
+REBUILD_REPLICAS = int(os.getenv("OPENSEARCH_REBUILD_REPLICAS", "1"))
+REBUILD_TIMEOUT_SEC = int(os.getenv("OPENSEARCH_REBUILD_TIMEOUT_SEC", "1800"))
+# "opensearch" queries OpenSearch, except keyword intents served by the local candidate pools, and
+# falls back to the local index when OpenSearch is unavailable; set "local" to serve every search
+# from the crawl's local vector index (OpenSearch until a build exists).
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "opensearch")
+# Shared by every request so the per-query fan-out reuses the same threads; the query embeddings
+# it runs are single batches, which embed_texts calls inline.
+_query_executor = ThreadPoolExecutor(max_workers=int(os.getenv("QUERY_FANOUT_WORKERS", "16")), thread_name_prefix="query")
 
 def refresh_aws_auth():
-    global aws_auth, opensearch_client
-    credentials = boto3.Session().get_credentials()
-    aws_auth = AWS4Auth(credentials.access_key, credentials.secret_key, 'ap-northeast-1', 'es', session_token=credentials.token)
-    opensearch_client = OpenSearch(
-        hosts=[{'host': os.getenv("OpenSearch_Domain"), 'port': 443}],
-        http_auth=aws_auth, 
-        use_ssl=True,
-        verify_certs=True,
-        connection_class=RequestsHttpConnection,
-        timeout=20,
-    )
-    logging.info("AWS credentials and OpenSearch client refreshed.")
-
-def create_index_for_opensearch(index_name: str = "products"):
-    """Create an OpenSearch index with k-NN settings if it doesn't exist."""
-    if not opensearch_client.indices.exists(index=index_name):
+    """Refresh AWS credentials on the shared OpenSearch client without dropping its connection pool."""
+    registry.refresh_aws_auth()
+    logging.info(f"AWS credentials refreshed, OpenSearch pool stats: {registry.pool_stats()['opensearch_pools']}")
+
+def create_index_for_opensearch(index_name: str = "products", settings: Optional[Dict] = None):
+    """Create an OpenSearch index with k-NN settings if it doesn't exist; settings are merged into its index settings."""
+    if not get_opensearch_client().indices.exists(index=index_name):
         index_body = {
             "settings": {
-                "index": {"knn": True}
+                "index": {"knn": True, **(settings or {})}
             },
             "mappings": {
                 "properties": {
-                    "embedding": {
-                        "type": "knn_vector",
-                        "dimension": 1536,
-                        "method": {
-                            "name": "hnsw",
-                            "space_type": "cosinesimil",
-                            "engine": "lucene",
-                        }
-                    }
+                    "embedding": EMBEDDING_PROFILE.knn_mapping()
                 }
             }
         }
         try:
-            opensearch_client.indices.create(index=index_name, body=index_body)
-            logging.info(f"Index created: {index_name}")
+            get_opensearch_client().indices.create(index=index_name, body=index_body)
+            logging.info(f"Index created: {index_name} with embedding profile {EMBEDDING_PROFILE.name}")
         except Exception as e:
             logging.error(f"Failed to create index '{index_name}': {str(e)}")
             raise
     else:
         logging.info(f"Index already exists: {index_name}")
 
+def create_rebuild_index(alias: str = "products") -> str:
+    """Create a dated index behind nothing yet, tuned for one bulk load: no refreshes and no replicas."""
+    index_name = f"{alias}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    create_index_for_opensearch(index_name, settings={"refresh_interval": "-1", "number_of_replicas": 0})
+    return index_name
+
+def _alias_targets(alias: str) -> List[str]:
+    client = get_opensearch_client()
+    if client.indices.exists_alias(name=alias):
+        return list(client.indices.get_alias(name=alias).keys())
+    return []
+
+def publish_rebuild_index(index_name: str, alias: str = "products"):
+    """Force-merge the loaded index, restore its settings, then atomically point the alias at it and drop the old index.
+
+    The first swap also replaces a concrete index that still carries the alias name.
+    """
+    client = get_opensearch_client()
+    old_indices = _alias_targets(alias)
+    concrete = not old_indices and client.indices.exists(index=alias)
+    source = old_indices[0] if old_indices else alias if concrete else None
+    replicas = int(client.indices.get_settings(index=source)[source]["settings"]["index"]["number_of_replicas"]) if source else REBUILD_REPLICAS
+    start = time.perf_counter()
+    client.indices.refresh(index=index_name)
+    client.indices.forcemerge(index=index_name, max_num_segments=1, request_timeout=REBUILD_TIMEOUT_SEC)
+    # None resets refresh_interval to the cluster default.
+    client.indices.put_settings(index=index_name, body={"index": {"refresh_interval": None, "number_of_replicas": replicas}})
+    health = client.cluster.health(index=index_name, wait_for_status="green" if replicas else "yellow",
+                                   timeout=f"{REBUILD_TIMEOUT_SEC}s", request_timeout=REBUILD_TIMEOUT_SEC + 30)
+    if health.get("timed_out"):
+        logging.warning(f"Index '{index_name}' is {health['status']} after {REBUILD_TIMEOUT_SEC}s, swapping anyway")
+    actions = [{"remove": {"index": old, "alias": alias}} for old in old_indices]
+    if concrete:
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": index_name, "alias": alias}})
+    client.indices.update_aliases(body={"actions": actions})
+    for old in old_indices:
+        client.indices.delete(index=old)
+    logging.info(f"Alias '{alias}' now points to '{index_name}' ({client.count(index=alias)['count']} documents, {replicas} replicas), "
+                 f"replaced {old_indices or ([alias] if concrete else [])} after {time.perf_counter() - start:.1f}s of merge and swap")
+
+def drop_rebuild_index(index_name: str):
+    """Delete an unpublished rebuild index after a failed crawl; the alias keeps serving the previous one."""
+    try:
+        get_opensearch_client().indices.delete(index=index_name, ignore_unavailable=True)
+        logging.info(f"Dropped unpublished index '{index_name}'")
+    except Exception as e:
+        logging.error(f"Failed to drop unpublished index '{index_name}': {str(e)}")
+
 def get_document_count_from_opensearch(index_name: str = "products", e_commercesite: str = "\0", keyword: str = "\0") -> int:
     """Return the total number of documents in the specified OpenSearch index and optionally filter by e_commercesite."""
     try:
@@ -97,7 +147,7 @@ def get_document_count_from_opensearch(index_name: str = "products", e_commerces
                     }
                 }
             }
-        response = opensearch_client.count(index=index_name, body=query)
+        response = get_opensearch_client().count(index=index_name, body=query)
         logging.info(f"Total documents in index '{index_name}': {response['count']}")
         print(query)
         return response['count']
@@ -119,7 +169,7 @@ def store_and_replace_items_from_opensearch(items: List[Dict], index_name: str =
                 "price_twd": item["price_twd"],
                 "href": item["href"],
                 "image_url": item["image_url"],
-                "embedding": item["embedding"],
+                "embedding": EMBEDDING_PROFILE.encode(item["embedding"]),
                 "keyword": item["keyword"],
                 "timestamp": item["timestamp"]
             }
@@ -129,7 +179,7 @@ def store_and_replace_items_from_opensearch(items: List[Dict], index_name: str =
                 "query": {
                     "knn": {
                         "embedding": {
-                            "vector": item["embedding"],
+                            "vector": doc["embedding"],
                             "k": 3,
                             "filter": {
                                 "bool": {
@@ -150,25 +200,153 @@ def store_and_replace_items_from_opensearch(items: List[Dict], index_name: str =
                 vec2 = np.array(vec2)
                 return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
             
-            response = opensearch_client.search(index=index_name, body=most_similar_item_query)
+            response = get_opensearch_client().search(index=index_name, body=most_similar_item_query)
             hits = response["hits"]["hits"]
 
             for hit in hits:
                 similar_item_id = hit["_id"]
                 logging.info(f"Checking similar item: {hit['_source']['name']} (ID: {similar_item_id})")
                 similar_embedding = hit["_source"]["embedding"]
-                if cosine_similarity(item["embedding"], similar_embedding) > 0.95 and item["keyword"] == hit["_source"]["keyword"]:
+                if cosine_similarity(doc["embedding"], similar_embedding) > 0.95 and item["keyword"] == hit["_source"]["keyword"]:
                     deleted_item_counts += 1
-                    opensearch_client.delete(index=index_name, id=similar_item_id)
+                    get_opensearch_client().delete(index=index_name, id=similar_item_id)
                     logging.info(f"Item deleted: {hit['_source']['name']} (similar to {item['name']})")
             new_item_counts += 1
-            opensearch_client.index(index=index_name, body=doc)
+            get_opensearch_client().index(index=index_name, body=doc)
             logging.info(f"Item stored: {item['name']}")
             time.sleep(0.5)  # Sleep to avoid rate limiting
         except Exception as e:
             logging.error(f"Failed to store item: {item['name']} - {str(e)}")
     logging.info(f"Total items deleted: {deleted_item_counts}, new items stored: {new_item_counts} in index '{index_name}'")
 
+def _find_replaced_ids(items, index_name: str) -> List[str]:
+    """Decide locally which existing documents the new CrawlBatch replaces, with one scan per (keyword, e_commercesite)."""
+    replaced_ids = []
+    for (keyword, site), rows in items.groups().items():
+        query = {
+            "query": {"bool": {"must": [{"match": {"keyword": keyword}}, {"match": {"e_commercesite": site}}]}},
+            "_source": ["keyword", "embedding"],
+        }
+        existing = [hit for hit in helpers.scan(get_opensearch_client(), query=query, index=index_name)
+                    if hit["_source"].get("keyword") == keyword]
+        if not existing:
+            continue
+        existing_matrix = _normalized_matrix([hit["_source"]["embedding"] for hit in existing])
+        new_matrix = _normalized_matrix(items.vectors()[rows][:, :EMBEDDING_PROFILE.dimensions])
+        similarities = new_matrix @ existing_matrix.T
+        # Like the per-document path, each new item only considers its 3 nearest neighbours.
+        top = np.argsort(-similarities, axis=1)[:, :3]
+        replaced = {int(j) for i, row in enumerate(top) for j in row if similarities[i, j] > SIMILARITY_THRESHOLD}
+        replaced_ids.extend(existing[j]["_id"] for j in replaced)
+        logging.info(f"{keyword}/{site}: {len(rows)} new items replace {len(replaced)} of {len(existing)} existing")
+    return replaced_ids
+
+class _BulkThrottle:
+    """Shared delay between bulk requests: doubles on 429 responses and decays on success."""
+
+    def __init__(self, max_delay: float = 30.0):
+        self.delay = 0.0
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self.delay
+        if delay:
+            time.sleep(delay)
+
+    def throttled(self):
+        with self._lock:
+            self.delay = min(max(self.delay * 2, 0.5), self.max_delay)
+
+    def succeeded(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > 0.05 else 0.0
+
+def _record_failed(report: Dict, actions: List[Dict]):
+    report["failed"] += len(actions)
+    report["failed_ids"].extend(action["id"] for action in actions if action["op"] != "delete" and action.get("id"))
+
+def failed_document_ids(reports: List[Dict]) -> set:
+    """Ids of the documents a bulk call could not index or update, across its chunk reports."""
+    return {doc_id for report in reports for doc_id in report["failed_ids"]}
+
+def _send_bulk_chunk(chunk_id: int, actions: List[Dict], items, index_name: str, throttle: _BulkThrottle, max_retries: int) -> Dict:
+    """Send one chunk of bulk actions, retrying only the items rejected with 429.
+
+    Index actions refer to a row of the items CrawlBatch; its document is only built while the chunk is sent.
+    The report lists the ids of the index and update actions that failed, so callers can write them again.
+    """
+    report = {"chunk": chunk_id, "actions": len(actions), "succeeded": 0, "failed": 0, "throttled": 0, "failed_ids": []}
+    pending = actions
+    for attempt in range(max_retries + 1):
+        throttle.wait()
+        body = []
+        for action in pending:
+            body.append({action["op"]: {"_index": index_name, **({"_id": action["id"]} if action.get("id") else {})}})
+            if action["op"] == "index":
+                doc = items.document(action["row"])
+                doc["embedding"] = EMBEDDING_PROFILE.encode(doc["embedding"])
+                body.append(doc)
+            elif action["op"] == "update":
+                body.append({"doc": action["doc"]})
+        try:
+            response = get_opensearch_client().bulk(body=body)
+        except TransportError as e:
+            if e.status_code != 429:
+                logging.error(f"Bulk chunk {chunk_id} failed: {str(e)}")
+                _record_failed(report, pending)
+                return report
+            report["throttled"] += len(pending)
+            throttle.throttled()
+            continue
+        retry = []
+        for action, result in zip(pending, response["items"]):
+            status = next(iter(result.values()))["status"]
+            if status == 429:
+                retry.append(action)
+            elif status < 300 or (action["op"] == "delete" and status == 404):
+                report["succeeded"] += 1
+            else:
+                _record_failed(report, [action])
+                logging.warning(f"Bulk {action['op']} rejected with status {status}: {next(iter(result.values())).get('error')}")
+        if not retry:
+            throttle.succeeded()
+            return report
+        report["throttled"] += len(retry)
+        throttle.throttled()
+        pending = retry
+    logging.error(f"Bulk chunk {chunk_id} gave up on {len(pending)} throttled actions")
+    _record_failed(report, pending)
+    return report
+
+def bulk_store_and_replace_items_from_opensearch(items, index_name: str = "products", replaced_ids: Optional[List[str]] = None,
+                                                 partial_updates: Optional[Dict[str, Dict]] = None, chunk_size: int = BULK_CHUNK_SIZE,
+                                                 concurrency: int = BULK_CONCURRENCY, max_retries: int = BULK_MAX_RETRIES) -> List[Dict]:
+    """Store a CrawlBatch through chunked _bulk requests, deleting highly similar existing items decided locally.
+
+    When replaced_ids is None (no local dedupe snapshot yet) the replaced documents are found by scanning the index.
+    partial_updates maps document ids to fields to update in place, e.g. a refreshed timestamp.
+    """
+    if replaced_ids is None:
+        replaced_ids = _find_replaced_ids(items, index_name)
+    actions = [{"op": "delete", "id": doc_id} for doc_id in replaced_ids]
+    actions.extend({"op": "update", "id": doc_id, "doc": fields} for doc_id, fields in (partial_updates or {}).items())
+    actions.extend({"op": "index", "id": doc_id, "row": row} for row, doc_id in enumerate(items.columns["ids"].tolist()))
+    chunks = [actions[i:i + chunk_size] for i in range(0, len(actions), chunk_size)]
+    throttle = _BulkThrottle()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        reports = list(executor.map(lambda args: _send_bulk_chunk(*args, items, index_name, throttle, max_retries), enumerate(chunks)))
+    elapsed = time.perf_counter() - start
+    for report in reports:
+        logging.info(f"Bulk chunk {report['chunk']}: {report['succeeded']} succeeded, {report['failed']} failed, {report['throttled']} throttled")
+    succeeded = sum(report["succeeded"] for report in reports)
+    failed = sum(report["failed"] for report in reports)
+    logging.info(f"Bulk ingest into '{index_name}': {len(replaced_ids)} deletes, {len(partial_updates or {})} updates and {len(items)} inserts in {len(chunks)} chunks, "
+                 f"{succeeded} succeeded, {failed} failed in {elapsed:.1f}s")
+    return reports
+
 def delete_outdated_items_from_opensearch(index_name: str = "products", days: int = 2):
     """Delete items from OpenSearch with timestamps older than the specified number of days."""
     retry_count = 0
@@ -177,7 +355,7 @@ def delete_outdated_items_from_opensearch(index_name: str = "products", days: in
         try:
             cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
             query = {"query": {"range": {"timestamp": {"lte": cutoff_time}}}}
-            response = opensearch_client.delete_by_query(index=index_name, body=query)
+            response = get_opensearch_client().delete_by_query(index=index_name, body=query)
             deleted = response["deleted"]
             logging.info(f"Deleted {deleted} outdated items")
             break
@@ -194,7 +372,7 @@ def delete_all_items_from_opensearch(index_name: str = "products"):
         retry_count += 1
         try:
             query = {"query": {"match_all": {}}}
-            response = opensearch_client.delete_by_query(index=index_name, body=query)
+            response = get_opensearch_client().delete_by_query(index=index_name, body=query)
             logging.info(f"Deleted {response['deleted']} documents from index '{index_name}'")
             # opensearch_client.indices.delete(index=index_name)
             # logging.info(f"Deleted index '{index_name}'")
@@ -205,7 +383,7 @@ def delete_all_items_from_opensearch(index_name: str = "products"):
         logging.error("Failed to delete all items after 3 attempts")
 
 def find_k_similar_items(opensearch_client, json_response: dict, en_embedding: list, zh_embedding: list, index_name: str = "products") -> list:
-    """Execute k-NN search to retrieve exact counts for each e_comercesite based on JSON response."""
+    """Execute k-NN search to retrieve exact counts for each e_comercesite based on JSON response, as one _msearch."""
     # logging.warning(">>> find_k_similar_items() called")
     try:
         results = []
@@ -215,6 +393,8 @@ def find_k_similar_items(opensearch_client, json_response: dict, en_embedding: l
             ("momo", json_response.get("momo_count", 0))
         ]
         
+        searches = []
+        body = []
         for site, count in site_counts:
             if count > 0:
                 filters = [{"match": {"e_commercesite": site}}]
@@ -229,7 +409,7 @@ def find_k_similar_items(opensearch_client, json_response: dict, en_embedding: l
                     "query": {
                         "knn":{
                             "embedding": {
-                                "vector": en_embedding if site == "ebay" else zh_embedding,
+                                "vector": EMBEDDING_PROFILE.encode(en_embedding if site == "ebay" else zh_embedding),
                                 "k": count,
                                 "filter": {
                                     "bool": {
@@ -242,11 +422,19 @@ def find_k_similar_items(opensearch_client, json_response: dict, en_embedding: l
                     },
                     "_source": ["e_commercesite", "name", "price_twd", "href", "image_url", "keyword"]
                 }
-                
-                response = opensearch_client.search(index=index_name, body=query)
-                hits = response["hits"]["hits"]
-                results.extend([hit["_source"] for hit in hits])
-                logging.info(f"Found {len(hits)} items for {site} in index '{index_name}'")
+                searches.append(site)
+                body.extend([{"index": index_name}, query])
+
+        if not searches:
+            return results
+        with span("opensearch.msearch", sites=",".join(searches)):
+            response = opensearch_client.msearch(body=body)
+        for site, site_response in zip(searches, response["responses"]):
+            if "error" in site_response:
+                raise TransportError(site_response.get("status", 500), str(site_response["error"]), site_response["error"])
+            hits = site_response["hits"]["hits"]
+            results.extend([hit["_source"] for hit in hits])
+            logging.info(f"Found {len(hits)} items for {site} in index '{index_name}'")
         return results
     except TransportError as e:
         if e.status_code == 504:
@@ -258,13 +446,14 @@ def find_k_similar_items(opensearch_client, json_response: dict, en_embedding: l
         logging.error(f"Search failed in index '{index_name}': {str(e)}")
         raise
 
-def search_top_k_similar_items_from_opensearch(en_userprompt: str, zh_userprompt: str, index_name: str = "products") -> List[Dict]:
-    """Search for similar products using k-NN based on user input."""
-    try:
-        from openai import OpenAI
-        openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        en_embedding = openai_client.embeddings.create(input=en_userprompt, model=os.getenv("OPENAI_EMBEDDING_MODEL")).data[0].embedding
-        zh_embedding = openai_client.embeddings.create(input=zh_userprompt, model=os.getenv("OPENAI_EMBEDDING_MODEL")).data[0].embedding
+def extract_intent(openai_client, zh_userprompt: str) -> dict:
+    """Parse site counts, keyword and price range as JSON, asking the chat model only when the local rules are unsure."""
+    with span("intent.rules"):
+        response_dict = parse_intent(zh_userprompt)
+    if response_dict is not None:
+        logging.info(f"Parsed response locally: {response_dict}")
+        return response_dict
+    with span("intent.llm"):
         reply = openai_client.chat.completions.create(
             model=os.getenv("OPENAI_CHAT_MODEL"),
             messages=[
@@ -278,15 +467,49 @@ def search_top_k_similar_items_from_opensearch(en_userprompt: str, zh_userprompt
                 }
             ]
         )
-        response_dict = json.loads(reply.choices[0].message.content)
-        logging.info(f"Parsed response: {response_dict}")
-        response = find_k_similar_items(
-            opensearch_client,
-            response_dict,
-            en_embedding,
-            zh_embedding,
-            index_name=index_name
-        )
+    response_dict = json.loads(reply.choices[0].message.content)
+    logging.info(f"Parsed response: {response_dict}")
+    return response_dict
+
+def _find_k_similar_items_with_fallback(json_response: dict, en_embedding: list, zh_embedding: list, index_name: str) -> list:
+    """Run the k-NN search on SEARCH_BACKEND, using the other backend when the preferred one cannot answer.
+
+    With the default SEARCH_BACKEND=opensearch, intents naming a keyword are answered from the local
+    per-(site, keyword) candidate pools; OpenSearch serves the rest.
+    """
+    if (SEARCH_BACKEND == "local" or json_response.get("keyword")) and local_index.available(EMBEDDING_PROFILE.dimensions):
+        return local_index.find_k_similar_items(json_response, en_embedding, zh_embedding)
+    try:
+        return find_k_similar_items(get_opensearch_client(), json_response, en_embedding, zh_embedding, index_name=index_name)
+    except TransportError as e:
+        # "N/A" is the status opensearch-py reports for connection errors and timeouts.
+        if e.status_code not in (502, 503, 504, "N/A") or not local_index.available(EMBEDDING_PROFILE.dimensions):
+            raise
+        logging.warning(f"OpenSearch unavailable ({e.status_code}), serving search from the local index")
+        return local_index.find_k_similar_items(json_response, en_embedding, zh_embedding)
+
+def search_top_k_similar_items_from_opensearch(en_userprompt: Optional[str], zh_userprompt: str, index_name: str = "products",
+                                               translate: Optional[Callable[[str], str]] = None) -> List[Dict]:
+    """Search for similar products using k-NN based on user input.
+
+    The zh embedding, the intent completion and the translation run concurrently; when en_userprompt
+    is None it is produced by translate(zh_userprompt) and embedded as soon as it arrives.
+    """
+    try:
+        openai_client = get_openai_client()
+        key = query_cache.normalize(zh_userprompt)
+        products = query_cache.get("products", key)
+        if products is not None:
+            logging.info(f"Query cache hit for '{zh_userprompt}'")
+            return products
+        en_source = (lambda: translate(zh_userprompt)) if en_userprompt is None else (lambda: en_userprompt)
+        # Query embeddings are cached by embed_text's EmbeddingCache, translations by the translation layer.
+        zh_future = _query_executor.submit(bind(embed_text), zh_userprompt, openai_client)
+        intent_future = _query_executor.submit(bind(query_cache.get_or_compute), "intent", key, lambda: extract_intent(openai_client, zh_userprompt))
+        en_future = _query_executor.submit(bind(lambda: embed_text(en_source(), openai_client)))
+        start = time.perf_counter()
+        response = _find_k_similar_items_with_fallback(intent_future.result(), en_future.result(), zh_future.result(), index_name)
+        query_cache.set("products", key, response, time.perf_counter() - start)
         return response
     except Exception as e:
         logging.error(f"Search failed: {e}")
@@ -0,0 +1,47 @@
+import logging, hashlib
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+def product_id(item: Dict) -> str:
+    """Stable document id for a product listing, derived from its site and href.
+
+    The keyword is part of the id because the same listing can be crawled under two keywords
+    and each keyword partition keeps its own document.
+    """
+    return hashlib.sha1(f"{item['e_commercesite']}\0{item['keyword']}\0{item['href']}".encode("utf-8")).hexdigest()
+
+def content_hash(item: Dict) -> str:
+    """Hash of the fields shown to users; a change means the document must be re-embedded and rewritten."""
+    return hashlib.sha1(f"{item['name']}\0{item['price_twd']}\0{item.get('image_url') or ''}".encode("utf-8")).hexdigest()
+
+def classify_items(batch, snapshot: Optional[Dict[str, np.ndarray]]) -> Dict:
+    """Split a CrawlBatch into new, changed and unchanged batches against the index snapshot.
+
+    Repeated listings keep their first row. Unchanged rows get their indexed embeddings back from
+    the snapshot so they never need the embeddings API.
+    """
+    _, first = np.unique(batch.columns["ids"], return_index=True)
+    batch = batch.select(np.sort(first))
+    rows = {}
+    if snapshot is not None:
+        rows = {doc_id: row for row, doc_id in enumerate(snapshot["ids"].tolist())}
+    snapshot_rows = np.asarray([rows.get(doc_id, -1) for doc_id in batch.columns["ids"].tolist()], dtype=np.int64)
+    known = snapshot_rows >= 0
+    same = np.zeros(len(batch), dtype=bool)
+    if known.any():
+        same[known] = snapshot["content_hashes"][snapshot_rows[known]] == batch.columns["content_hashes"][known]
+    unchanged = batch.select(same)
+    unchanged.embeddings = np.asarray(snapshot["embeddings"][snapshot_rows[same]], dtype=np.float32) if same.any() else None
+    return {"new": batch.select(~known), "changed": batch.select(known & ~same), "unchanged": unchanged}
+
+def expire_items(snapshot: Optional[Dict[str, np.ndarray]], days: int = 2) -> Tuple[Optional[Dict[str, np.ndarray]], List[str]]:
+    """Remove documents not seen for the given number of days, returning the trimmed snapshot and their ids."""
+    if snapshot is None or not len(snapshot["ids"]):
+        return snapshot, []
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    expired = snapshot["timestamps"] <= cutoff
+    expired_ids = snapshot["ids"][expired].tolist()
+    return {name: column[~expired] for name, column in snapshot.items()}, expired_ids
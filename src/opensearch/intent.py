@@ -0,0 +1,154 @@
+import os, re, logging
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+
+KEYWORDS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/search_keywords.txt'))
+LABELED_QUERIES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/intent_queries.json'))
+SITES = ("pchome", "ebay", "momo")
+TOTAL_COUNT = 6
+
+# Common ways users name catalog products beyond the exact zh/en keywords.
+KEYWORD_ALIASES = {
+    "treadmill": ["跑步機", "走步機"],
+    "dumbbell": ["啞鈴", "dumbbells"],
+    "yoga mat": ["瑜伽墊", "瑜珈墊", "yoga mats"],
+    "resistance band": ["彈力帶", "彈力繩", "阻力帶", "拉力帶", "resistance bands"],
+    "hand grip strengthener": ["握力器", "握力", "hand grip", "grip strengthener"],
+    "exercise ball": ["健身球", "瑜伽球", "瑜珈球", "抗力球", "exercise balls"],
+    "jump rope": ["跳繩", "skipping rope"],
+    "tablet": ["平板電腦", "平板", "ipad", "tablets"],
+    "bluetooth earphone": ["藍牙耳機", "無線耳機", "耳機", "bluetooth earphones", "earbuds", "earphones", "earphone", "airpods"],
+    "smartphone": ["智慧型手機", "智慧手機", "手機", "iphone", "smartphones", "phone"],
+    "mouse": ["滑鼠", "mice"],
+    "laptop": ["筆電", "筆記型電腦", "筆記本電腦", "notebook", "laptops", "macbook"],
+    "charging cable": ["充電線", "傳輸線", "快充線", "charging cables", "usb cable"],
+    "power bank": ["行動電源", "power banks", "powerbank", "portable charger"],
+}
+NEGATION_PATTERN = re.compile(r"不要|不想|除了|排除|以外|不含|\bnot\b|\bexcept\b|\bwithout\b|\bno\b", re.IGNORECASE)
+ACCESSORY_SUFFIX = re.compile(r"(?:殼|套|架|座|膜|貼|包|袋|墊|\s*(?:case|cover|bag|stand|holder|pad|sleeve|protector|strap)\b)")
+ONLY_PATTERN = re.compile(r"只|限|僅|\bonly\b", re.IGNORECASE)
+NUMBER = r"(\d[\d,]*(?:\.\d+)?)\s*(萬|千|k)?"
+RANGE_PATTERNS = [
+    re.compile(NUMBER + r"\s*(?:元|塊)?\s*(?:到|至|~|～|-|–|to)\s*" + NUMBER, re.IGNORECASE),
+    re.compile(r"between\s*" + NUMBER + r"\s*and\s*" + NUMBER, re.IGNORECASE),
+    re.compile(r"介於\s*" + NUMBER + r"\s*(?:元)?\s*(?:和|與|跟|到)\s*" + NUMBER, re.IGNORECASE),
+]
+CEILING_PATTERNS = [
+    re.compile(NUMBER + r"\s*(?:元|塊|twd|nt\$?)?\s*(?:以下|以內|之內|內|below|or less|or under)", re.IGNORECASE),
+    re.compile(r"(?:低於|少於|小於|不超過|不到|預算|under|below|less than|lower than|cheaper than|at most|max)\s*(?:nt\$|\$)?\s*" + NUMBER, re.IGNORECASE),
+]
+FLOOR_PATTERNS = [
+    re.compile(NUMBER + r"\s*(?:元|塊|twd|nt\$?)?\s*(?:以上|起|or more|and up|or above)", re.IGNORECASE),
+    re.compile(r"(?:高於|多於|大於|超過|至少|above|over|more than|higher than|at least|min)\s*(?:nt\$|\$)?\s*" + NUMBER, re.IGNORECASE),
+]
+
+def load_keyword_pairs(path: str = KEYWORDS_PATH) -> List[Tuple[str, str]]:
+    """Return (en_keyword, zh_keyword) pairs from the keyword file."""
+    with open(path, "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    keywords = {
+        "Fitness": {"zh": [], "en": []},
+        "Technology": {"zh": [], "en": []},
+    }
+    current_category = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            current_category = line[1:].strip().split('-')
+        elif line and current_category:
+            keywords[current_category[0]][current_category[1]].append(line)
+    return [(en_keyword, zh_keyword) for category in keywords
+            for zh_keyword, en_keyword in zip(keywords[category]["zh"], keywords[category]["en"])]
+
+def _build_terms() -> List[Tuple[str, str]]:
+    terms = {}
+    for en_keyword, zh_keyword in load_keyword_pairs():
+        for term in [en_keyword, zh_keyword] + KEYWORD_ALIASES.get(en_keyword, []):
+            terms[term.lower()] = en_keyword
+    # Longest first so "藍牙耳機" wins over "耳機" and "yoga mat" over "mat".
+    return sorted(terms.items(), key=lambda term: -len(term[0]))
+
+TERMS = _build_terms()
+
+def _to_int(number: str, unit: Optional[str]) -> int:
+    value = float(number.replace(",", ""))
+    multiplier = {"萬": 10000, "千": 1000, "k": 1000}.get((unit or "").lower(), 1)
+    return int(value * multiplier)
+
+def _find_keywords(text: str) -> Optional[List[str]]:
+    """Return the catalog keywords named in text, or None when one is only named as an accessory target."""
+    found = []
+    remaining = text
+    for term, en_keyword in TERMS:
+        is_ascii = term.isascii()
+        pattern = rf"(?<![a-z]){re.escape(term)}(?![a-z])" if is_ascii else re.escape(term)
+        if re.search(pattern, remaining):
+            # "手機殼" or "laptop bag" is not a search for the product itself
+            if re.search(pattern + ACCESSORY_SUFFIX.pattern, remaining, re.IGNORECASE):
+                return None
+            remaining = re.sub(pattern, " ", remaining)
+            if en_keyword not in found:
+                found.append(en_keyword)
+    return found
+
+def _find_prices(text: str) -> Tuple[Optional[int], Optional[int], str]:
+    """Return (floor, ceiling, text with the matched price phrases removed)."""
+    for pattern in RANGE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            low, high = _to_int(match.group(1), match.group(2)), _to_int(match.group(3), match.group(4))
+            return min(low, high), max(low, high), text[:match.start()] + text[match.end():]
+    floor = ceiling = None
+    for pattern in CEILING_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            ceiling = _to_int(match.group(1), match.group(2))
+            text = text[:match.start()] + text[match.end():]
+            break
+    for pattern in FLOOR_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            floor = _to_int(match.group(1), match.group(2))
+            text = text[:match.start()] + text[match.end():]
+            break
+    return floor, ceiling, text
+
+def _site_counts(text: str) -> Optional[Dict[str, int]]:
+    mentioned = [site for site in SITES if site in text]
+    if not mentioned or len(mentioned) == len(SITES):
+        return {f"{site}_count": TOTAL_COUNT // len(SITES) for site in SITES}
+    if not ONLY_PATTERN.search(text) and len(mentioned) > 1:
+        return None
+    share, extra = divmod(TOTAL_COUNT, len(mentioned))
+    counts = {f"{site}_count": 0 for site in SITES}
+    for i, site in enumerate(mentioned):
+        counts[f"{site}_count"] = share + (1 if i < extra else 0)
+    return counts
+
+def parse_intent(user_input: str) -> Optional[Dict]:
+    """Deterministically parse common queries into the system-prompt JSON, or return None when unsure.
+
+    Unsure means negations, several catalog keywords, no catalog keyword, or numbers that are
+    not a recognised price phrase; those queries go to the chat model instead.
+    """
+    text = user_input.strip().lower()
+    if not text or NEGATION_PATTERN.search(text):
+        return None
+    keywords = _find_keywords(text)
+    if not keywords or len(keywords) != 1:
+        return None
+    floor, ceiling, rest = _find_prices(text)
+    for term, _ in TERMS:
+        rest = rest.replace(term, " ")
+    if re.search(r"\d{3,}", rest):
+        return None
+    counts = _site_counts(text)
+    if counts is None:
+        return None
+    return {
+        **counts,
+        "keyword": keywords[0],
+        "price_ceiling": ceiling if ceiling is not None else "",
+        "price_floor": floor if floor is not None else "",
+    }
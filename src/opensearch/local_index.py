@@ -0,0 +1,174 @@
+import os, re, logging, shutil, threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from datetime import datetime
+import numpy as np
+from opensearch.dedupe import _normalized_matrix
+from opensearch.tracing import span
+
+logging.basicConfig(level=logging.INFO)
+
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/local_index')))
+# Builds kept on disk besides the current one, so workers still mapping the previous build keep working.
+LOCAL_INDEX_KEEP_BUILDS = int(os.getenv("LOCAL_INDEX_KEEP_BUILDS", "1"))
+SITES = ("pchome", "ebay", "momo")
+
+def _tokens(text: str) -> set:
+    # Same lowercase word split as the OpenSearch standard analyzer, which the "match" filters rely on.
+    return set(re.findall(r"\w+", text.lower()))
+
+def build_local_index(snapshot: Optional[Dict[str, np.ndarray]], path: str = LOCAL_INDEX_DIR) -> Optional[str]:
+    """Write the snapshot's documents as a new local index build and point CURRENT at it.
+
+    Vectors are stored row-normalized as a float32 .npy and the displayed fields as a structured
+    .npy, so readers map both files instead of parsing anything at startup. Snapshot rows written
+    before the snapshot carried display fields are skipped until the next crawl refreshes them.
+    """
+    if snapshot is None or not len(snapshot["ids"]):
+        logging.info("No snapshot documents, local index not rebuilt")
+        return None
+    rows = np.flatnonzero((snapshot["hrefs"] != "") & (snapshot["prices"] >= 0))
+    # Each (site, keyword) candidate pool becomes one contiguous block of rows sorted by price.
+    rows = rows[np.lexsort((snapshot["prices"][rows], snapshot["keywords"][rows], snapshot["sites"][rows]))]
+    columns = {
+        "id": snapshot["ids"][rows],
+        "e_commercesite": snapshot["sites"][rows],
+        "keyword": snapshot["keywords"][rows],
+        "name": snapshot["names"][rows],
+        "price_twd": snapshot["prices"][rows],
+        "href": snapshot["hrefs"][rows],
+        "image_url": snapshot["image_urls"][rows],
+    }
+    meta = np.empty(len(rows), dtype=[(name, column.dtype) for name, column in columns.items()])
+    for name, column in columns.items():
+        meta[name] = column
+    pool_keys = np.char.add(np.char.add(columns["e_commercesite"], "\0"), columns["keyword"])
+    starts = np.flatnonzero(np.r_[True, pool_keys[1:] != pool_keys[:-1]]) if len(rows) else np.zeros(0, dtype=np.int64)
+    pools = np.empty(len(starts), dtype=[("site", columns["e_commercesite"].dtype), ("keyword", columns["keyword"].dtype),
+                                         ("start", np.int64), ("end", np.int64)])
+    pools["site"], pools["keyword"] = columns["e_commercesite"][starts], columns["keyword"][starts]
+    pools["start"], pools["end"] = starts, np.r_[starts[1:], len(rows)]
+    build = os.path.join(path, datetime.now().strftime("%Y%m%dT%H%M%S%f"))
+    os.makedirs(build)
+    np.save(os.path.join(build, "vectors.npy"), _normalized_matrix(snapshot["embeddings"][rows]))
+    np.save(os.path.join(build, "meta.npy"), meta)
+    np.save(os.path.join(build, "prices.npy"), columns["price_twd"])
+    np.save(os.path.join(build, "pools.npy"), pools)
+    current = os.path.join(path, "CURRENT")
+    with open(current + ".tmp", "w") as file:
+        file.write(os.path.basename(build))
+    os.replace(current + ".tmp", current)
+    builds = sorted(name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)))
+    for old in builds[:-(LOCAL_INDEX_KEEP_BUILDS + 1)]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+    logging.info(f"Built local index with {len(meta)}/{len(snapshot['ids'])} snapshot documents in {len(pools)} candidate pools at {build}")
+    return build
+
+class _Build(NamedTuple):
+    """One mapped build; searches hold a single reference so a reload never mixes two builds."""
+    name: str
+    vectors: np.ndarray
+    meta: np.ndarray
+    prices: np.ndarray
+    pools: Dict[Tuple[str, str], Tuple[int, int]]
+    keywords: List[Tuple[str, Set[str]]]
+
+class LocalVectorIndex:
+    """Exact cosine k-NN over the memory-mapped products of the latest crawl, with the OpenSearch filters.
+
+    Rows are stored as one price-sorted block per (site, keyword) candidate pool, so a search is a
+    binary search on the pool's prices and one matrix-vector product over the rows in range. A new
+    build published by a crawl is picked up on the next search in every process, by watching the
+    CURRENT pointer file.
+    """
+
+    def __init__(self, path: str = LOCAL_INDEX_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._build: Optional[_Build] = None
+
+    def _current(self) -> Optional[str]:
+        build = self._build
+        return build.name if build is not None else None
+
+    def _reload(self):
+        current = os.path.join(self.path, "CURRENT")
+        try:
+            with open(current) as file:
+                build = file.read().strip()
+        except FileNotFoundError:
+            return
+        if build == self._current():
+            return
+        with self._lock:
+            if build == self._current():
+                return
+            if not os.path.exists(os.path.join(self.path, build, "pools.npy")):
+                logging.warning(f"Local index build {build} has no candidate pools, waiting for the next crawl")
+                return
+            vectors = np.load(os.path.join(self.path, build, "vectors.npy"), mmap_mode="r")
+            meta = np.load(os.path.join(self.path, build, "meta.npy"), mmap_mode="r")
+            prices = np.load(os.path.join(self.path, build, "prices.npy"), mmap_mode="r")
+            pools = {(pool["site"].item(), pool["keyword"].item()): (int(pool["start"]), int(pool["end"]))
+                     for pool in np.load(os.path.join(self.path, build, "pools.npy"))}
+            keywords = [(keyword, _tokens(keyword)) for keyword in sorted({keyword for _, keyword in pools})]
+            self._build = _Build(build, vectors, meta, prices, pools, keywords)
+            logging.info(f"Local index mapped build {build} with {len(meta)} documents in {len(pools)} candidate pools")
+
+    def available(self, dimensions: Optional[int] = None) -> bool:
+        """Whether a non-empty build is mapped, and holds vectors of the given size when one is passed."""
+        self._reload()
+        build = self._build
+        if build is None or not len(build.meta):
+            return False
+        return dimensions is None or build.vectors.shape[1] == dimensions
+
+    def search(self, vector: list, site: str, count: int, keyword: str = "", price_floor=None, price_ceiling=None) -> List[Dict]:
+        """Return the count nearest documents of one site passing the same filters as the OpenSearch query."""
+        self._reload()
+        build = self._build
+        if build is None or count <= 0:
+            return []
+        vectors, meta, prices, pools = build.vectors, build.meta, build.prices, build.pools
+        if keyword:
+            query_tokens = _tokens(keyword)
+            blocks = [pools[(site, name)] for name, tokens in build.keywords if tokens & query_tokens and (site, name) in pools]
+        else:
+            blocks = [block for (pool_site, _), block in pools.items() if pool_site == site]
+        ranges = []
+        for start, end in blocks:
+            low = start + (np.searchsorted(prices[start:end], int(price_floor), "left") if price_floor else 0)
+            high = start + (np.searchsorted(prices[start:end], int(price_ceiling), "right") if price_ceiling else end - start)
+            if low < high:
+                ranges.append((low, high))
+        if not ranges:
+            return []
+        query = _normalized_matrix([vector])[0]
+        scores = np.concatenate([vectors[low:high] @ query for low, high in ranges])
+        rows = np.concatenate([np.arange(low, high) for low, high in ranges])
+        top = np.argpartition(-scores, count - 1)[:count] if count < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [{
+            "e_commercesite": str(doc["e_commercesite"]),
+            "name": str(doc["name"]),
+            "price_twd": int(doc["price_twd"]),
+            "href": str(doc["href"]),
+            "image_url": str(doc["image_url"]) or None,
+            "keyword": str(doc["keyword"]),
+        } for doc in meta[rows[top]]]
+
+    def find_k_similar_items(self, json_response: dict, en_embedding: list, zh_embedding: list) -> list:
+        """Local counterpart of function.find_k_similar_items, returning the same _source dicts."""
+        results = []
+        for site in SITES:
+            count = json_response.get(f"{site}_count", 0)
+            if count > 0:
+                with span("local.search", site=site):
+                    hits = self.search(en_embedding if site == "ebay" else zh_embedding, site, count,
+                                       keyword=json_response.get("keyword") or "",
+                                       price_floor=json_response.get("price_floor"),
+                                       price_ceiling=json_response.get("price_ceiling"))
+                results.extend(hits)
+                logging.info(f"Found {len(hits)} items for {site} in local index")
+        return results
+
+local_index = LocalVectorIndex()
@@ -0,0 +1,59 @@
+import os, re, logging
+from typing import Dict, List, Optional
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+# Output size of the embedding model; profiles with fewer dimensions ask the API for shortened vectors.
+NATIVE_DIMENSIONS = int(os.getenv("OPENAI_EMBEDDING_DIMENSIONS", "1536"))
+DATA_TYPES = ("float", "fp16", "byte")
+
+class EmbeddingProfile:
+    """How product and query vectors are sized and stored in the products index, named "<data_type>-<dimensions>".
+
+    float keeps 4-byte lucene vectors, fp16 uses faiss scalar quantization and byte stores lucene
+    int8 vectors. Reduced dimensions rely on the text-embedding-3 models returning shortened
+    vectors for the API's dimensions parameter, which equals truncating and renormalizing.
+    """
+
+    def __init__(self, name: str):
+        match = re.fullmatch(r"(float|fp16|byte)-(\d+)", name)
+        if not match or not 0 < int(match.group(2)) <= NATIVE_DIMENSIONS:
+            raise ValueError(f"Invalid embedding profile '{name}', expected <{'|'.join(DATA_TYPES)}>-<dimensions up to {NATIVE_DIMENSIONS}>")
+        self.name = name
+        self.data_type = match.group(1)
+        self.dimensions = int(match.group(2))
+
+    @property
+    def request_dimensions(self) -> Optional[int]:
+        """Value for the embeddings API dimensions parameter, None to keep the model's native size."""
+        return self.dimensions if self.dimensions != NATIVE_DIMENSIONS else None
+
+    def knn_mapping(self) -> Dict:
+        """knn_vector mapping of the embedding field for this profile."""
+        if self.data_type == "fp16":
+            # faiss has no cosine space; encode() normalizes vectors, so inner product ranks identically.
+            return {"type": "knn_vector", "dimension": self.dimensions, "method": {
+                "name": "hnsw", "space_type": "innerproduct", "engine": "faiss",
+                "parameters": {"encoder": {"name": "sq", "parameters": {"type": "fp16"}}}}}
+        mapping = {"type": "knn_vector", "dimension": self.dimensions,
+                   "method": {"name": "hnsw", "space_type": "cosinesimil", "engine": "lucene"}}
+        if self.data_type == "byte":
+            mapping["data_type"] = "byte"
+        return mapping
+
+    def encode(self, vector) -> List:
+        """Vector as sent to OpenSearch: truncated to the profile, unit length, and scaled to int8 for byte."""
+        vector = np.asarray(vector, dtype=np.float32)[:self.dimensions]
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        if self.data_type == "byte":
+            peak = np.abs(vector).max() or 1.0
+            return np.clip(np.round(vector / peak * 127), -128, 127).astype(np.int64).tolist()
+        return vector.tolist()
+
+    def bytes_per_vector(self) -> int:
+        return self.dimensions * {"float": 4, "fp16": 2, "byte": 1}[self.data_type]
+
+EMBEDDING_PROFILE = EmbeddingProfile(os.getenv("EMBEDDING_PROFILE", f"float-{NATIVE_DIMENSIONS}"))
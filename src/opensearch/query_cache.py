@@ -0,0 +1,140 @@
+import os, logging, time, json, sqlite3, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from opensearch.embedding import normalize_text
+
+logging.basicConfig(level=logging.INFO)
+
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory")
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/query_cache.sqlite3')))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+# Products only change when the daily crawl finishes, which also invalidates them explicitly.
+# Query embeddings are not a layer: embed_text already looks them up in the on-disk EmbeddingCache.
+LAYER_TTL = {"intent": 7 * 24 * 3600, "translation": 30 * 24 * 3600, "products": 24 * 3600}
+
+class InProcessBackend:
+    """Bounded LRU dict with per-entry expiry, local to one process."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class SQLiteBackend:
+    """File-backed cache shared by every gunicorn worker on the host; values are stored as JSON."""
+
+    def __init__(self, path: str = QUERY_CACHE_PATH, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < time.time()):
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None, now))
+            self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+            self._conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                               (self.max_entries,))
+            self._conn.commit()
+
+class QueryCache:
+    """Layered cache for LINE searches: parsed intent, translations and the final product list.
+
+    Product entries are keyed by a crawl generation stored in the backend, so bumping it after a
+    crawl invalidates every worker sharing the backend while intents and translations stay warm.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or InProcessBackend()
+        self._lock = threading.Lock()
+        self._stats = {layer: {"hits": 0, "misses": 0, "miss_seconds": 0.0} for layer in LAYER_TTL}
+
+    @staticmethod
+    def normalize(user_input: str) -> str:
+        return normalize_text(user_input).casefold()
+
+    def _key(self, layer: str, key: str) -> str:
+        if layer == "products":
+            return f"products:{self.backend.get('generation') or 0}:{key}"
+        return f"{layer}:{key}"
+
+    def get(self, layer: str, key: str) -> Optional[Any]:
+        value = self.backend.get(self._key(layer, key))
+        if value is not None:
+            with self._lock:
+                self._stats[layer]["hits"] += 1
+        return value
+
+    def set(self, layer: str, key: str, value: Any, miss_seconds: float = 0.0):
+        self.backend.set(self._key(layer, key), value, LAYER_TTL[layer])
+        with self._lock:
+            self._stats[layer]["misses"] += 1
+            self._stats[layer]["miss_seconds"] += miss_seconds
+
+    def get_or_compute(self, layer: str, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(layer, key)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self.set(layer, key, value, time.perf_counter() - start)
+        return value
+
+    def invalidate_products(self):
+        """Start a new crawl generation; product lists cached before it are never read again."""
+        self.backend.set("generation", (self.backend.get("generation") or 0) + 1)
+        logging.info("Query cache product layer invalidated")
+
+    def stats(self) -> Dict:
+        """Hit rate per layer and latency saved, estimated from the average miss cost."""
+        with self._lock:
+            report = {}
+            for layer, counters in self._stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                avg_miss = counters["miss_seconds"] / counters["misses"] if counters["misses"] else 0.0
+                report[layer] = {
+                    "hits": counters["hits"],
+                    "misses": counters["misses"],
+                    "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+                    "saved_seconds": counters["hits"] * avg_miss,
+                }
+            return report
+
+def _make_backend():
+    if QUERY_CACHE_BACKEND == "sqlite":
+        return SQLiteBackend()
+    return InProcessBackend()
+
+query_cache = QueryCache(_make_backend())
@@ -0,0 +1,107 @@
+import os, json, time, uuid, random, logging, threading, contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+# Fraction of traces whose full span breakdown is logged; slow traces are always logged.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "3000"))
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Cumulative latency histogram per stage, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            counts = self._stages.setdefault(stage, {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0})
+            counts["buckets"][bisect_left(self.buckets, seconds)] += 1
+            counts["sum"] += seconds
+            counts["count"] += 1
+
+    def render(self, name: str = "line_bot_stage_duration_seconds") -> str:
+        lines = [f"# HELP {name} Duration of each stage of the LINE webhook path.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, counts in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(list(self.buckets) + ["+Inf"], counts["buckets"]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {counts["sum"]:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {counts["count"]}')
+        return "\n".join(lines) + "\n"
+
+histogram = Histogram()
+
+class Trace:
+    """Spans recorded while handling one request, possibly from several threads."""
+
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.start = time.perf_counter()
+        self.sampled = random.random() < TRACE_SAMPLE_RATE
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, seconds: float, attrs: Dict):
+        with self._lock:
+            self.spans.append({"stage": name, "offset_ms": round((start - self.start) * 1000, 2), "ms": round(seconds * 1000, 2), **attrs})
+
+    def breakdown(self) -> Dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["offset_ms"])
+        return {"trace": self.id, "name": self.name, "ms": round((time.perf_counter() - self.start) * 1000, 2), "spans": spans}
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage into the histogram and, inside a trace, into its breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        histogram.observe(name, seconds)
+        trace = _current.get()
+        if trace is not None:
+            trace.add(name, start, seconds, attrs)
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """Start a trace for a request; inside an existing trace this is just a span."""
+    if _current.get() is not None:
+        with span(name, **attrs):
+            yield
+        return
+    trace = Trace(name)
+    token = _current.set(trace)
+    try:
+        with span(name, **attrs):
+            yield trace
+    finally:
+        _current.reset(token)
+        breakdown = trace.breakdown()
+        if breakdown["ms"] >= SLOW_REQUEST_MS:
+            logging.warning(f"Slow {name} ({breakdown['ms']:.0f} ms): {json.dumps(breakdown, ensure_ascii=False)}")
+        elif trace.sampled:
+            logging.info(f"Trace {json.dumps(breakdown, ensure_ascii=False)}")
+
+def bind(fn: Callable) -> Callable:
+    """Wrap fn so spans it records from a worker thread land in the caller's trace."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+def observe(name: str, seconds: float):
+    """Record a duration measured elsewhere, e.g. time spent in a queue."""
+    histogram.observe(name, seconds)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds, {})
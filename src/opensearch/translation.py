@@ -0,0 +1,103 @@
+import os, re, time, logging, threading
+from typing import Callable, Dict, List, Tuple
+from opensearch.intent import ACCESSORY_SUFFIX, KEYWORD_ALIASES, load_keyword_pairs, _find_prices
+from opensearch.query_cache import query_cache
+
+logging.basicConfig(level=logging.INFO)
+
+CJK = re.compile(r"[㐀-鿿豈-﫿]")
+# Request wording that carries no product meaning for the English embedding.
+FILLER = ["我想買", "我想找", "幫我找", "請幫我", "有沒有", "推薦", "想找", "想要", "我要", "請問", "一下", "只要", "預算", "之間",
+          "的", "嗎", "找", "限", "只", "元", "塊"]
+# Site choices are read from the zh text by the intent parser, so they are left out of the en query.
+SITE_WORDS = re.compile(r"\b(?:pchome|momo|ebay|only)\b", re.IGNORECASE)
+PUNCTUATION = re.compile(r"[\s,.!?;:~、，。！？；：～&()（）\-]+")
+
+def load_glossary() -> List[Tuple[str, str]]:
+    """zh catalog keywords and their zh aliases mapped to the en keyword, longest first."""
+    glossary = {}
+    for en_keyword, zh_keyword in load_keyword_pairs():
+        for term in [zh_keyword] + [alias for alias in KEYWORD_ALIASES.get(en_keyword, []) if CJK.search(alias)]:
+            glossary[term] = en_keyword
+    return sorted(glossary.items(), key=lambda term: -len(term[0]))
+
+def _term_pattern(term: str) -> re.Pattern:
+    # A term only stands for the catalog keyword as a whole word: not before an accessory suffix
+    # (手機殼 is not a smartphone) and not before more Chinese unless that starts a filler word.
+    fillers = "|".join(re.escape(filler) for filler in FILLER)
+    return re.compile(f"{re.escape(term)}(?!{ACCESSORY_SUFFIX.pattern})(?=$|[^{CJK.pattern[1:-1]}]|{fillers})", re.IGNORECASE)
+
+class Translator:
+    """zh to en query translation that only calls the remote translator for text the glossary cannot cover.
+
+    Text without Chinese is returned as is. Otherwise whole catalog terms are replaced by their en
+    keywords; when only filler, prices and site names remain the result is built locally, and
+    else the original text goes to the remote translator. Results are memoized in the query
+    cache's bounded "translation" layer.
+    """
+
+    def __init__(self, remote: Callable[[str], str], glossary: List[Tuple[str, str]] = None):
+        self.remote = remote
+        self.glossary = glossary if glossary is not None else load_glossary()
+        self._patterns = [(_term_pattern(term), en_keyword) for term, en_keyword in self.glossary]
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "passthrough": 0, "glossary": 0, "remote_calls": 0, "remote_failures": 0, "remote_seconds": 0.0}
+
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def local(self, text: str) -> Tuple[str, bool]:
+        """Return (en query, True) when the glossary covers all of text, else (text unchanged, False)."""
+        substituted = text
+        for pattern, en_keyword in self._patterns:
+            substituted = pattern.sub(f" {en_keyword} ", substituted)
+        _, _, rest = _find_prices(substituted)
+        for filler in FILLER:
+            rest = rest.replace(filler, " ")
+        if CJK.search(rest):
+            return text, False
+        return " ".join(PUNCTUATION.sub(" ", SITE_WORDS.sub(" ", rest)).split()), True
+
+    def _translate(self, text: str) -> str:
+        if not CJK.search(text):
+            self._count("passthrough")
+            return text
+        substituted, complete = self.local(text)
+        if complete and substituted:
+            self._count("glossary")
+            logging.info(f"Translated '{text}' to '{substituted}' from the glossary")
+            return substituted
+        start = time.perf_counter()
+        self._count("remote_calls")
+        try:
+            return self.remote(text)
+        finally:
+            self._count("remote_seconds", time.perf_counter() - start)
+
+    def translate(self, text: str) -> str:
+        """Translate zh text to en; when the remote translator fails the text is returned as is and uncached."""
+        self._count("lookups")
+        key = query_cache.normalize(text)
+        translated = query_cache.get("translation", key)
+        if translated is not None:
+            return translated
+        start = time.perf_counter()
+        try:
+            translated = self._translate(text)
+        except Exception as e:
+            self._count("remote_failures")
+            logging.error(f"Translation failed for '{text}': {e}")
+            return text
+        query_cache.set("translation", key, translated, time.perf_counter() - start)
+        return translated
+
+    def stats(self) -> Dict:
+        """Where translations came from; every lookup not sent to the remote translator is an avoided call."""
+        with self._lock:
+            stats = dict(self._stats)
+        cache = query_cache.stats()["translation"]
+        stats["cache_hits"] = cache["hits"]
+        stats["avoided_remote_calls"] = stats["lookups"] - stats["remote_calls"]
+        stats["avoided_rate"] = stats["avoided_remote_calls"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
@@ -0,0 +1,120 @@
+import os, logging, threading, queue, atexit
+from contextlib import contextmanager
+from functools import lru_cache
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+logging.basicConfig(level=logging.INFO)
+
+CHROME_POOL_SIZE = int(os.getenv("CHROME_POOL_SIZE", "2"))
+CHROME_MAX_USES = int(os.getenv("CHROME_MAX_USES", "20"))
+
+@lru_cache(maxsize=1)
+def chromedriver_path() -> str:
+    """Resolve the chromedriver binary once per process."""
+    return ChromeDriverManager().install()
+
+def chrome_options() -> Options:
+    # Configure Chrome options for Linux
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--lang=en-US')
+    return options
+
+class DriverPool:
+    """A fixed number of headless Chrome sessions handed out to scraper jobs one at a time.
+
+    Browsers start lazily, are reset between jobs, and are replaced after max_uses jobs or
+    whenever they stop responding.
+    """
+
+    def __init__(self, size: int = CHROME_POOL_SIZE, max_uses: int = CHROME_MAX_USES):
+        self.max_uses = max_uses
+        self._slots = queue.Queue()
+        for _ in range(max(1, size)):
+            self._slots.put(None)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+
+    def _start(self):
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options())
+        with self._lock:
+            self.started += 1
+            self._uses[id(driver)] = 0
+        logging.info("Started pooled Chrome driver")
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.recycled += 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Failed to quit Chrome driver: {e}")
+
+    def _reset(self, driver) -> bool:
+        """Clear per-job state, returning False when the browser no longer responds."""
+        try:
+            for handle in driver.window_handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logging.warning(f"Chrome driver unhealthy, recycling: {e}")
+            return False
+
+    @contextmanager
+    def driver(self):
+        """Borrow a browser for one scraper job."""
+        driver = self._slots.get()
+        try:
+            if driver is None:
+                driver = self._start()
+        except Exception:
+            self._slots.put(None)
+            raise
+        healthy = False
+        try:
+            yield driver
+            healthy = True
+        finally:
+            with self._lock:
+                self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+                worn_out = self._uses[id(driver)] >= self.max_uses
+            if healthy and not worn_out and self._reset(driver):
+                self._slots.put(driver)
+            else:
+                self._discard(driver)
+                self._slots.put(None)
+
+    def close(self):
+        """Quit every idle browser."""
+        while True:
+            try:
+                driver = self._slots.get_nowait()
+            except queue.Empty:
+                return
+            if driver is not None:
+                self._discard(driver)
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+def get_driver_pool() -> DriverPool:
+    """Return the process-wide driver pool, starting it on first use."""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool()
+            atexit.register(_driver_pool.close)
+        return _driver_pool
@@ -1,32 +1,111 @@
-from selenium import webdriver
+import os, re, sys, logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
-import time, random, logging
+from src.scrapers.driver_pool import get_driver_pool
+from src.scrapers.html_extract import parse_html, fetch_html
+from src.scrapers.run_report import record
 
 logging.basicConfig(level=logging.INFO)
 
-def scraper(keyword, max_items=100):
-    # Configure Chrome options for Linux
-    options = Options()
-    options.add_argument('--headless')  
-    options.add_argument('--no-sandbox')  
-    options.add_argument('--disable-dev-shm-usage')  
-    options.add_argument('--lang=en-US') 
+EBAY_SEARCH_URL = "https://www.ebay.com/sch/i.html"
+EBAY_HTTP_MAX_PAGES = 5
+
+def parse_ebay_html(html, keyword):
+    """Extract the product card rows of server-rendered eBay search HTML, in the EXTRACT_PRODUCTS_JS shape.
+
+    The rows still go through parse_ebay_products, which drops the "Shop on eBay" placeholder; they
+    are returned raw so the caller can spot pages holding only eBay's two invalid cards first.
+    """
+    rows = []
+    for card in parse_html(html).find_all('s-item__wrapper'):
+        title = card.find('s-item__title')
+        price = card.find('s-item__price')
+        link = card.find('s-item__link')
+        image_wrapper = card.find('s-item__image-wrapper')
+        image = image_wrapper.find(tag='img') if image_wrapper else None
+        rows.append({
+            "name": title.text() if title else None,
+            "price": price.text() if price else None,
+            "href": link.attrs.get("href") if link else None,
+            "image_url": (image.attrs.get("src") or image.attrs.get("data-src")) if image else None,
+        })
+    return rows
+
+def fetch_ebay_items(keyword, max_items=100, max_pages=EBAY_HTTP_MAX_PAGES, session=None):
+    """Fetch eBay search pages without a browser, returning [] when the HTML carries no product cards."""
+    items, seen = [], set()
+    for page in range(1, max_pages + 1):
+        try:
+            html = fetch_html(EBAY_SEARCH_URL, params={"_nkw": keyword, "_pgn": page}, session=session)
+        except Exception as e:
+            logging.warning(f"HTTP fetch of eBay page {page} failed: {e}")
+            break
+        record("pages")
+        rows = parse_ebay_html(html, keyword)
+        if len(rows) == 2:
+            logging.error("Only 2 products found, it's ebay problem that only show 2 invalid products")
+            record("invalid_pages")
+            break
+        page_items = [item for item in parse_ebay_products(rows, keyword) if item["href"] not in seen]
+        if not page_items:
+            break
+        for item in page_items:
+            seen.add(item["href"])
+            items.append(item)
+            if len(items) >= max_items:
+                return items
+    return items
 
+def scraper(keyword, max_items=100, driver_pool=None):
     try:
-        driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
+        with (driver_pool or get_driver_pool()).driver() as driver:
+            return _scrape(driver, keyword, max_items)
     except Exception as e:
         logging.error(f"Failed to initialize ChromeDriver: {e}")
         return []
 
+# Pull every product card on the page in one round trip instead of 5-6 WebDriver calls per product.
+EXTRACT_PRODUCTS_JS = """
+return Array.from(document.getElementsByClassName('s-item__wrapper')).map(card => {
+    const title = card.querySelector('.s-item__title');
+    const price = card.querySelector('.s-item__price');
+    const link = card.querySelector('.s-item__link');
+    const image = card.querySelector('.s-item__image-wrapper.image-treatment img');
+    return {
+        name: title ? title.innerText.trim() : null,
+        price: price ? price.innerText : null,
+        href: link ? link.href : null,
+        image_url: image ? image.src : null
+    };
+});
+"""
+
+# eBay renders a "Shop on eBay" card linking to a dummy listing ahead of the real results.
+PLACEHOLDER_TITLE = "shop on ebay"
+PLACEHOLDER_HREF = re.compile(r"/itm/123456(?:[/?#]|$)")
+
+def _is_placeholder(row):
+    return (row.get("name") or "").strip().lower() == PLACEHOLDER_TITLE or bool(PLACEHOLDER_HREF.search(row.get("href") or ""))
+
+def parse_ebay_products(rows, keyword):
+    """Turn the rows returned by EXTRACT_PRODUCTS_JS into item dicts, skipping incomplete and placeholder cards."""
+    items = []
+    for row in rows:
+        if not row.get("name") or not row.get("href") or not row.get("price") or _is_placeholder(row):
+            continue
+        price_text = row["price"].replace('NT', '').replace('$', '').replace(',', '').strip()
+        try:
+            price = int(float(price_text.split(' to ')[0]))
+        except ValueError:
+            logging.warning(f"Invalid price format: {price_text}")
+            continue
+        items.append({"e_commercesite": "ebay", "name": row["name"], "price_twd": price, "href": row["href"], "image_url": row.get("image_url"), "keyword": keyword})
+    return items
+
+def _scrape(driver, keyword, max_items):
     search_url = f"https://www.ebay.com/sch/i.html?_nkw={keyword.replace(' ', '+')}"
     items = []
 
@@ -50,41 +129,21 @@ def scraper(keyword, max_items=100):
         while current_page <= total_pages:  
             logging.info(f"Scraping page {current_page}: {driver.current_url}")
 
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, 's-item__wrapper'))
+            first_product = WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.CLASS_NAME, 's-item__wrapper'))
             )
-            products = driver.find_elements(By.CLASS_NAME, 's-item__wrapper')
-            if len(products) == 2:
+            rows = driver.execute_script(EXTRACT_PRODUCTS_JS)
+            record("pages")
+            if len(rows) == 2:
                 logging.error("Only 2 products found, it's ebay problem that only show 2 invalid products")
+                record("invalid_pages")
                 return items
-            for p in products:
-                time.sleep(0.1) # Small delay to avoid overwhelming the page
-                try:
-                    name = p.find_element(By.CLASS_NAME, 's-item__title').text
-                    price_element = p.find_element(By.CLASS_NAME, 's-item__price')
-                    price_text = price_element.text.replace('NT', '').replace('$', '').replace(',', '').strip()
-                    try:
-                        price = int(float(price_text.split(' to ')[0])) 
-                    except ValueError:
-                        logging.warning(f"Invalid price format: {price_text}")
-                        continue
-
-                    href = p.find_element(By.CLASS_NAME, 's-item__link').get_attribute('href')
-                    image_wrapper = p.find_element(By.CSS_SELECTOR, '.s-item__image-wrapper.image-treatment')
-                    img_tag = image_wrapper.find_element(By.TAG_NAME, 'img')
-                    image_url = img_tag.get_attribute('src')
-                    items.append({"e_commercesite": "ebay", "name": name, "price_twd": price, "href": href, "image_url": image_url, "keyword": keyword})
-                    logging.info(f"name: {name}, price_twd: {price}, href: {href}, image_url: {image_url}, keyword: {keyword}")
-                    if len(items) >= max_items:
-                        logging.info(f"Reached {max_items} items, stopping")
-                        return items
-
-                except StaleElementReferenceException:
-                    logging.warning("Stale element encountered, skipping product")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error parsing product: {e}")
-                    continue
+            for item in parse_ebay_products(rows, keyword):
+                items.append(item)
+                logging.info(f"name: {item['name']}, price_twd: {item['price_twd']}, href: {item['href']}, image_url: {item['image_url']}, keyword: {keyword}")
+                if len(items) >= max_items:
+                    logging.info(f"Reached {max_items} items, stopping")
+                    return items
 
             if current_page < total_pages:
                 max_attempts = 3
@@ -98,12 +157,14 @@ def scraper(keyword, max_items=100):
                             return items
 
                         next_button.click()
-                        time.sleep(random.uniform(2, 4))  # Random delay to avoid detection
+                        # The next page is a full navigation, so the old product list goes stale once it starts loading
+                        WebDriverWait(driver, 15).until(EC.staleness_of(first_product))
                         current_page += 1
                         break
 
                     except StaleElementReferenceException:
                         logging.warning(f"Stale next button on attempt {attempt + 1}")
+                        record("retries")
                         if attempt == max_attempts - 1:
                             logging.error("Max attempts reached for next button")
                             return items
@@ -114,18 +175,22 @@ def scraper(keyword, max_items=100):
 
     except Exception as e:
         logging.error(f"Error during scraping: {e}")
-    finally:
-        driver.quit()
-        logging.info("Browser closed")
 
     return items
 
-def scrape_ebay(keyword, max_items=100):
-    data = []
+def scrape_ebay(keyword, max_items=100, driver_pool=None):
+    """Try the plain HTTP fetcher first and only start Chrome when it finds nothing."""
+    data = fetch_ebay_items(keyword, max_items)
+    if data:
+        return data
+    logging.info(f"HTTP fetch found no eBay products for {keyword}, falling back to Selenium")
+    record("fallbacks")
     max_attempts = 10
     attempts = 0
     while not data and attempts < max_attempts:
-        data = scraper(keyword, max_items)
+        if attempts:
+            record("retries")
+        data = scraper(keyword, max_items, driver_pool=driver_pool)
         attempts += 1
     for item in data:
         print(item)
@@ -0,0 +1,89 @@
+import os, sys, logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from src.scrapers.http_session import get_session
+
+logging.basicConfig(level=logging.INFO)
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9,zh-TW;q=0.8",
+}
+
+class Node:
+    """A minimal element tree node: tag, attributes, children and text."""
+
+    __slots__ = ("tag", "attrs", "children", "parent", "_text")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+        self._text = []
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.attrs.get("class") or "").split()
+
+    def iter(self):
+        yield self
+        for child in self.children:
+            if isinstance(child, Node):
+                yield from child.iter()
+
+    def find_all(self, class_name: str = None, tag: str = None) -> List["Node"]:
+        return [node for node in self.iter()
+                if (class_name is None or class_name in node.classes) and (tag is None or node.tag == tag)]
+
+    def find(self, class_name: str = None, tag: str = None) -> Optional["Node"]:
+        return next((node for node in self.iter()
+                     if (class_name is None or class_name in node.classes) and (tag is None or node.tag == tag)), None)
+
+    def text(self) -> str:
+        parts = []
+        for child in self.children:
+            parts.append(child.text() if isinstance(child, Node) else child)
+        return " ".join(" ".join(parts).split())
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("document", {})
+        self._current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or "" for name, value in attrs}, self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self._current.children.append(Node(tag, {name: value or "" for name, value in attrs}, self._current))
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed children by unwinding to the nearest matching ancestor.
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        if self._current.tag not in ("script", "style"):
+            self._current.children.append(data)
+
+def parse_html(html: str) -> Node:
+    """Parse an HTML document into a Node tree with the standard library parser."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def fetch_html(url: str, params: Dict = None, session=None, timeout: int = 10) -> str:
+    """GET a page over the shared keep-alive session with browser-like headers."""
+    response = (session or get_session()).get(url, params=params, headers=BROWSER_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    return response.text
@@ -1,79 +1,151 @@
 import os, sys, logging, time
+import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-from src.scrapers.momo import scrape_momo
-from src.scrapers.ebay import scrape_ebay
-from src.scrapers.pchome import scrape_pchome
+from src.scrapers.scheduler import run_crawl_jobs
+from src.scrapers.run_report import RunReport
 from opensearch.function import (
     create_index_for_opensearch,
     store_and_replace_items_from_opensearch, 
+    bulk_store_and_replace_items_from_opensearch,
+    failed_document_ids,
     delete_outdated_items_from_opensearch,
     delete_all_items_from_opensearch,
     get_document_count_from_opensearch,
     search_top_k_similar_items_from_opensearch,
-    refresh_aws_auth
+    refresh_aws_auth,
+    create_rebuild_index,
+    publish_rebuild_index,
+    drop_rebuild_index
 )
+from opensearch.embedding import embed_items, get_embedding_cache
+from opensearch.clients import get_openai_client
+from opensearch.query_cache import query_cache
+from opensearch.intent import load_keyword_pairs
+from opensearch.dedupe import dedupe_items, load_snapshot, save_snapshot, update_snapshot
+from opensearch.incremental import classify_items, expire_items
+from opensearch.local_index import build_local_index
+from opensearch.crawl_batch import CrawlBatch
 
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(dotenv_path=env_path, override=True)
 logging.basicConfig(level=logging.INFO) 
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# The stored rows of the latest crawl, kept as a memory-mappable batch for offline analysis; empty disables it.
+CRAWL_BATCH_PATH = os.getenv("CRAWL_BATCH_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/crawl_batch')))
+CRAWL_BATCH_DTYPE = os.getenv("CRAWL_BATCH_DTYPE", "float32")
+# "incremental" writes into the live index; set "rebuild" to load each crawl into a new dated index and swap the products alias to it.
+CRAWL_MODE = os.getenv("CRAWL_MODE", "incremental")
 
-def run_crawler():
-    """Run scraping, translation, and storage for all e-commerce sites."""
-    with open("./data/search_keywords.txt", "r", encoding="utf-8") as file:
-        lines = file.readlines()
+def run_crawler(scrapers=None):
+    """Run scraping, embedding, and storage for all e-commerce sites, streaming each finished job downstream.
+
+    Returns the run report, which is also saved under CRAWL_REPORT_DIR whether the run succeeds or not.
+    """
+    keyword_pairs = load_keyword_pairs()
+    # From the registry at run time, so a scheduler job in a forked worker gets that process's client.
+    openai_client = get_openai_client()
     retry_limit = 3
-    all_items = []
+    report = RunReport(CRAWL_MODE)
     for attempt in range(retry_limit):
+        rebuild_index = None
+        report.start_attempt()
         try:
-            create_index_for_opensearch()
-            keywords = {
-                "Fitness": {"zh": [], "en": []},
-                "Technology": {"zh": [], "en": []},
-            }
-            current_category = None
-            for line in lines:
-                line = line.strip()
-                if line.startswith("#"):
-                    current_category = line[1:].strip().split('-')
-                elif line and current_category:
-                    keywords[current_category[0]][current_category[1]].append(line)
-            for category in keywords:
-                for zh_keyword, en_keyword in zip(keywords[category]["zh"], keywords[category]["en"]):
-                    try:
-                        all_items.extend(scrape_ebay(en_keyword))
-                        all_items.extend(scrape_momo(en_keyword, zh_keyword))
-                        all_items.extend(scrape_pchome(en_keyword, zh_keyword))
-                    except Exception as e:
-                        logging.error(f"failed for {zh_keyword}/{en_keyword}: {str(e)}")
+            rebuild_index = create_rebuild_index() if CRAWL_MODE == "rebuild" else None
+            if rebuild_index is None:
+                create_index_for_opensearch()
             current_time = datetime.now().isoformat()
-            for item in all_items:
-                item["timestamp"] = current_time
-            logging.info(f"Collected {len(all_items)} items from all e-commerce sites")
-            for item in all_items:
-                embedding = openai_client.embeddings.create(input=item["name"], model=os.getenv("OPENAI_EMBEDDING_MODEL")).data[0].embedding
-                item["embedding"] = embedding 
-                logging.info(f"Created embedding for item: {item['name']}")
-            logging.info("All items embeddings have been created")
-
-            store_and_replace_items_from_opensearch(all_items)
-            logging.info("All items stored to OpenSearch")
-            delete_outdated_items_from_opensearch(days=2)
-            logging.info("Outdated items deleted from OpenSearch")
+            snapshot = load_snapshot()
+            next_snapshot = snapshot
+            counts = {"scraped": 0, "new": 0, "changed": 0, "unchanged": 0, "stored": 0, "expired": 0}
+            crawled = []
+            for job, items in run_crawl_jobs(keyword_pairs, scrapers=scrapers):
+                if not items:
+                    report.add_job(job)
+                    continue
+                counts["scraped"] += len(items)
+                # From here on the job's items travel as one columnar batch instead of dicts with list embeddings.
+                batch = CrawlBatch.from_items(items, timestamp=current_time)
+                changes = classify_items(batch, snapshot)
+                for change in ("new", "changed", "unchanged"):
+                    counts[change] += len(changes[change])
+                # Only new and changed products need embeddings and full documents; unchanged ones just get a fresh timestamp.
+                embedded_items, embedding_stats = embed_items(CrawlBatch.concat([changes["new"], changes["changed"]]), openai_client=openai_client)
+                unique_items, replaced_ids = dedupe_items(embedded_items, snapshot, exclude_ids=set(batch.columns["ids"].tolist()))
+                # A rebuild loads the finished snapshot into a fresh index instead, so the live index sees no writes.
+                write, failed_ids = None, []
+                if rebuild_index is None:
+                    write_start = time.perf_counter()
+                    reports = bulk_store_and_replace_items_from_opensearch(
+                        unique_items,
+                        replaced_ids=replaced_ids if snapshot is not None else None,
+                        partial_updates={doc_id: {"timestamp": current_time} for doc_id in changes["unchanged"].columns["ids"].tolist()}
+                    )
+                    write = RunReport.write_stats(reports, time.perf_counter() - write_start)
+                    failed_ids = sorted(failed_document_ids(reports))
+                stored = CrawlBatch.concat([unique_items, changes["unchanged"]])
+                if failed_ids:
+                    # Rejected inserts and updates (e.g. of a document missing from the index) leave the snapshot,
+                    # so the next crawl classifies them as new and indexes the full document again.
+                    logging.warning(f"{job['site']}/{job['keyword']}: {len(failed_ids)} documents failed to write, retrying them next crawl")
+                    stored = stored.select(~np.isin(stored.columns["ids"], failed_ids))
+                next_snapshot = update_snapshot(next_snapshot, stored, replaced_ids + failed_ids)
+                crawled.append(stored)
+                stored_count = len(unique_items) - int(np.isin(unique_items.columns["ids"], failed_ids).sum())
+                counts["stored"] += stored_count
+                report.add_job(job, {change: len(changes[change]) for change in ("new", "changed", "unchanged")} | {"stored": stored_count},
+                               embedding_stats, write)
+                logging.info(f"{job['site']}/{job['keyword']}: scraped {len(items)}, new {len(changes['new'])}, changed {len(changes['changed'])}, "
+                             f"unchanged {len(changes['unchanged'])}, stored {stored_count} in {job['duration_sec']:.1f}s scrape time")
+            next_snapshot, expired_ids = expire_items(next_snapshot, days=2)
+            counts["expired"] = len(expired_ids)
+            logging.info(f"Crawl summary: {counts}")
+            if get_embedding_cache():
+                logging.info(f"Embedding cache stats: {get_embedding_cache().stats()}")
+            if rebuild_index is not None:
+                documents = CrawlBatch.from_snapshot(next_snapshot) if next_snapshot is not None else CrawlBatch.from_items([])
+                write_start = time.perf_counter()
+                reports = bulk_store_and_replace_items_from_opensearch(documents, index_name=rebuild_index, replaced_ids=[])
+                report.add_write("rebuild_load", reports, time.perf_counter() - write_start)
+                failed = sum(report["failed"] for report in reports)
+                if failed:
+                    raise RuntimeError(f"{failed} documents failed to load into '{rebuild_index}', keeping the current index")
+                publish_rebuild_index(rebuild_index)
+                rebuild_index = None
+            else:
+                if expired_ids:
+                    write_start = time.perf_counter()
+                    reports = bulk_store_and_replace_items_from_opensearch(CrawlBatch.from_items([]), replaced_ids=expired_ids)
+                    report.add_write("expire", reports, time.perf_counter() - write_start)
+                # Catches documents the snapshot does not track, e.g. ones indexed before it existed.
+                delete_outdated_items_from_opensearch(days=2)
+                logging.info("Outdated items deleted from OpenSearch")
+            if next_snapshot is not None:
+                save_snapshot(next_snapshot)
+                build_local_index(next_snapshot)
+            if CRAWL_BATCH_PATH and crawled:
+                CrawlBatch.concat(crawled).quantize(CRAWL_BATCH_DTYPE).save(CRAWL_BATCH_PATH)
+            logging.info(f"Query cache stats before invalidation: {query_cache.stats()}")
+            query_cache.invalidate_products()
             logging.info("Crawler run completed successfully")
-            return
+            report.finish("succeeded", **counts)
+            logging.info(f"Crawl report totals: {report.report['totals']}")
+            report.save()
+            return report.report
         
         except Exception as e:
             logging.warning(f"Attempt {attempt} failed: {e}")
-            if attempt == retry_limit:
+            report.attempt_failed(e)
+            if rebuild_index is not None:
+                drop_rebuild_index(rebuild_index)
+            if attempt == retry_limit - 1:
                 logging.error("Failed to run crawler after multiple attempts, exiting.")
-                return
+                report.finish("failed", str(e))
+                report.save()
+                return report.report
             time.sleep(3) 
 
 if __name__ == "__main__":
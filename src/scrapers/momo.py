@@ -1,76 +1,137 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+import os, sys, re, logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import StaleElementReferenceException
-import time, logging
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from src.scrapers.driver_pool import get_driver_pool
+from src.scrapers.html_extract import parse_html, fetch_html
+from src.scrapers.run_report import record
+from urllib.parse import urljoin
 
 logging.basicConfig(level=logging.INFO)
 
-def scrape_momo(en_keyword, zh_keyword, max_items=100):
-    # Configure Chrome options for Linux
-    options = Options()
-    options.add_argument('--headless')  
-    options.add_argument('--no-sandbox')  
-    options.add_argument('--disable-dev-shm-usage')  
-    options.add_argument('--lang=en-US') 
-    
+MOMO_SEARCH_URL = "https://www.momoshop.com.tw/search/searchShop.jsp"
+MOMO_HTTP_MAX_PAGES = 5
+
+def scrape_momo(en_keyword, zh_keyword, max_items=100, driver_pool=None):
+    """Try the plain HTTP fetcher first and only start Chrome when it finds nothing."""
+    items = fetch_momo_items(en_keyword, zh_keyword, max_items)
+    if items:
+        return items
+    logging.info(f"HTTP fetch found no momo products for {zh_keyword}, falling back to Selenium")
+    record("fallbacks")
     try:
-        driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
+        with (driver_pool or get_driver_pool()).driver() as driver:
+            return _scrape_momo(driver, en_keyword, zh_keyword, max_items)
     except Exception as e:
         logging.error(f"Failed to initialize ChromeDriver: {e}")
         return []
-    
+
+# Pull every product card on the page in one round trip instead of 4 WebDriver calls per product.
+EXTRACT_PRODUCTS_JS = """
+return Array.from(document.querySelectorAll('.listAreaLi')).map(li => {
+    const name = li.querySelector('.prdNameTitle');
+    const price = li.querySelector('.price');
+    const link = li.querySelector('.goods-img-url');
+    const image = li.querySelector('.prdImg');
+    return {
+        name: name ? name.innerText.trim() : null,
+        price: price ? price.innerText : null,
+        href: link ? link.href : null,
+        image_url: image ? image.src : null
+    };
+});
+"""
+
+def parse_momo_products(rows, en_keyword):
+    """Turn the rows returned by EXTRACT_PRODUCTS_JS into item dicts, skipping incomplete cards."""
+    items = []
+    for row in rows:
+        price = re.sub(r"[^0-9]", "", row.get("price") or "")
+        if not row.get("name") or not row.get("href") or not price:
+            logging.warning(f"Skipping incomplete product: {row}")
+            continue
+        items.append({"e_commercesite": "momo", "name": row["name"], "price_twd": int(price), "href": row["href"], "image_url": row.get("image_url"), "keyword": en_keyword})
+    return items
+
+def parse_momo_html(html, en_keyword, base_url=MOMO_SEARCH_URL):
+    """Extract products from server-rendered momo search HTML, using the same fields as EXTRACT_PRODUCTS_JS."""
+    rows = []
+    for card in parse_html(html).find_all('listAreaLi'):
+        name = card.find('prdNameTitle')
+        price = card.find('price')
+        link = card.find('goods-img-url')
+        image = card.find('prdImg')
+        rows.append({
+            "name": name.text() if name else None,
+            "price": price.text() if price else None,
+            "href": urljoin(base_url, link.attrs.get("href", "")) if link and link.attrs.get("href") else None,
+            "image_url": (image.attrs.get("src") or image.attrs.get("data-original")) if image else None,
+        })
+    return parse_momo_products(rows, en_keyword)
+
+def fetch_momo_items(en_keyword, zh_keyword, max_items=100, max_pages=MOMO_HTTP_MAX_PAGES, session=None):
+    """Fetch momo search pages without a browser, returning [] when the HTML carries no product cards."""
+    items, seen = [], set()
+    for page in range(1, max_pages + 1):
+        try:
+            html = fetch_html(MOMO_SEARCH_URL, params={"keyword": zh_keyword, "curPage": page}, session=session)
+        except Exception as e:
+            logging.warning(f"HTTP fetch of momo page {page} failed: {e}")
+            break
+        record("pages")
+        page_items = [item for item in parse_momo_html(html, en_keyword) if item["href"] not in seen]
+        if not page_items:
+            break
+        for item in page_items:
+            seen.add(item["href"])
+            items.append(item)
+            if len(items) >= max_items:
+                return items
+    return items
+
+def _next_page_rows(driver, previous_first_href):
+    """Wait condition: the product list is rendered and no longer shows the previous page."""
+    rows = driver.execute_script(EXTRACT_PRODUCTS_JS)
+    if rows and rows[0].get("href") != previous_first_href:
+        return rows
+    return False
+
+def _scrape_momo(driver, en_keyword, zh_keyword, max_items):
     search_url = f"https://www.momoshop.com.tw/search/searchShop.jsp?keyword={zh_keyword}"
     items = []
 
     try:
         logging.info(f"Navigating to: {search_url}")
         driver.get(search_url)
-        start_page = 0
-        retry_count = 0
-        while start_page == 0 and retry_count < 10:
-            pages = driver.find_elements(By.CLASS_NAME, 'pagination-link')
-            start_page = len(pages) // 2 # momo pagination is invalide for first half of the pages, so we start from the second half
-            logging.info(f"Find {len(pages)} pages")
-            retry_count += 1
-        if retry_count == 10:
-            logging.error("Failed to find valid pagination links after 3 attempts")
-            driver.quit()
+        try:
+            # momo pagination is invalide for first half of the pages, so we start from the second half
+            pages = WebDriverWait(driver, 10, poll_frequency=0.25).until(
+                lambda d: (links := d.find_elements(By.CLASS_NAME, 'pagination-link')) and len(links) // 2 > 0 and links
+            )
+        except TimeoutException:
+            logging.error("Failed to find valid pagination links")
             return []
+        start_page = len(pages) // 2
+        logging.info(f"Find {len(pages)} pages")
         for page in pages[start_page:len(pages)]:
+            # momo swaps the list in place, so note what is showing before the click and wait until the extracted rows change
+            shown = driver.execute_script(EXTRACT_PRODUCTS_JS)
+            previous_first_href = shown[0].get("href") if shown else None
             page.click()
-            time.sleep(2) # Wait for page to load, can't use WebDriverWait here due to dynamic content
-            print(driver.current_url)
-            products = driver.find_elements(By.CLASS_NAME, 'listAreaLi')
-            for p in products:
-                time.sleep(0.1) # Small delay to avoid overwhelming the page
-                try:
-                    name = p.find_element(By.CLASS_NAME, 'prdNameTitle').text
-                    price = p.find_element(By.CLASS_NAME, 'price').text.replace(",", "")
-                    href = p.find_element(By.CLASS_NAME, 'goods-img-url').get_attribute('href')
-                    image_url = p.find_element(By.CLASS_NAME, 'prdImg').get_attribute('src')
-                    items.append({"e_commercesite": "momo", "name": name, "price_twd": int(price), "href": href, "image_url": image_url, "keyword": en_keyword})
-                    logging.info(f"name: {name}, price_twd: {price}, image_url: {image_url}, keyword: {en_keyword}")
-                    if len(items) >= max_items:
-                        logging.info(f"Reached maximum items limit: {max_items}")
-                        driver.quit()
-                        return items
-                except StaleElementReferenceException:
-                    logging.warning("Stale element encountered, skipping this product")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error parsing product: {e}")
-                    break
+            rows = WebDriverWait(driver, 10, poll_frequency=0.25).until(lambda d: _next_page_rows(d, previous_first_href))
+            record("pages")
+            logging.info(f"{driver.current_url}: {len(rows)} products")
+            for item in parse_momo_products(rows, en_keyword):
+                items.append(item)
+                logging.info(f"name: {item['name']}, price_twd: {item['price_twd']}, image_url: {item['image_url']}, keyword: {en_keyword}")
+                if len(items) >= max_items:
+                    logging.info(f"Reached maximum items limit: {max_items}")
+                    return items
+    except TimeoutException:
+        logging.warning("Timed out waiting for the next momo page")
     except Exception as e:
         logging.error(f"Error during scraping: {e}")
-    finally:
-        driver.quit()
-        logging.info("Browser closed")
     return items
 
 if __name__ == "__main__":
@@ -1,64 +1,81 @@
-import requests
-import time
-import logging
+import os, sys, math, logging
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.scrapers.http_session import get_session
+from src.scrapers.run_report import record
 
 logging.basicConfig(level=logging.INFO)
 
-def scrape_pchome(en_keyword, zh_keyword, max_items=100):
-    items = []
-    base_url = "https://ecshweb.pchome.com.tw/search/v3.3/all/results"
-    
-    # Fetch the first page to get total pages
+PCHOME_SEARCH_URL = os.getenv("PCHOME_SEARCH_URL", "https://ecshweb.pchome.com.tw/search/v3.3/all/results")
+PCHOME_MAX_CONCURRENCY = int(os.getenv("PCHOME_MAX_CONCURRENCY", "4"))
+PCHOME_TIMEOUT = 10
+
+def _fetch_page(session, zh_keyword, page, base_url):
     params = {
         "q": zh_keyword,
-        "page": 1,
+        "page": page,
         "sort": "sale/dc"
     }
-    
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status() # Raise an error for bad responses
-        data = response.json()
-        
-        total_pages = data.get('totalPage', 1) 
-        logging.info(f"Total pages found: {total_pages}")
-        
-        for page in range(1, total_pages + 1):
-            time.sleep(0.1) # Small delay to avoid overwhelming the page
-            logging.info(f"Scraping page {page}...")
-            params['page'] = page
-            try:
-                response = requests.get(base_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if 'prods' not in data or not data['prods']:
-                    logging.warning(f"No products found on page {page}")
-                    break
-                
-                for prod in data['prods']:
-                    name = prod['name']
-                    price = prod['price']
-                    href = f"https://24h.pchome.com.tw/prod/{prod['Id']}"
-                    image_url = f"https://cs-a.ecimg.tw/{prod['picB']}" if 'picB' in prod else None
-                    items.append({"e_commercesite": "pchome", "name": name, "price_twd": price, "href": href, "image_url": image_url, "keyword": en_keyword})
-                    logging.info(f"product: {name}, price_twd: {price}, url: {href}, image_url: {image_url}, keyword: {en_keyword}")
+    response = session.get(base_url, params=params, timeout=PCHOME_TIMEOUT)
+    response.raise_for_status() # Raise an error for bad responses
+    return response.json()
 
-                    if len(items) >= max_items:
-                        logging.info(f"Reached {max_items} items, stopping")
-                        return items
-                
-            
-            except Exception as e:
-                logging.error(f"Error on page {page}: {e}")
-                break
-                
+def _parse_products(data, en_keyword):
+    items = []
+    for prod in data.get('prods') or []:
+        name = prod['name']
+        price = prod['price']
+        href = f"https://24h.pchome.com.tw/prod/{prod['Id']}"
+        image_url = f"https://cs-a.ecimg.tw/{prod['picB']}" if 'picB' in prod else None
+        items.append({"e_commercesite": "pchome", "name": name, "price_twd": price, "href": href, "image_url": image_url, "keyword": en_keyword})
+    return items
+
+def scrape_pchome(en_keyword, zh_keyword, max_items=100, session=None, max_concurrency=PCHOME_MAX_CONCURRENCY, base_url=PCHOME_SEARCH_URL):
+    """Fetch page 1, then further pages concurrently in waves until max_items or totalPage is reached.
+
+    Each wave is sized from the products per page seen so far, so short or failed pages just lead
+    to another wave.
+    """
+    session = session or get_session()
+    try:
+        data = _fetch_page(session, zh_keyword, 1, base_url)
     except Exception as e:
         logging.error(f"Error fetching initial page: {e}")
-    
+        return []
+    record("pages")
+    items = _parse_products(data, en_keyword)
+    total_pages = data.get('totalPage', 1)
+    logging.info(f"Total pages found: {total_pages}")
+    if not items:
+        logging.warning("No products found on page 1")
+        return items
+
+    fetched, failed, next_page, exhausted = 1, 0, 2, False
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        while len(items) < max_items and next_page <= total_pages and not exhausted:
+            per_page = max(1, len(items) // fetched)
+            wave = min(total_pages - next_page + 1, math.ceil((max_items - len(items)) / per_page))
+            pages = list(range(next_page, next_page + wave))
+            next_page += wave
+            futures = [executor.submit(_fetch_page, session, zh_keyword, page, base_url) for page in pages]
+            for page, future in zip(pages, futures):
+                try:
+                    page_items = _parse_products(future.result(), en_keyword)
+                except Exception as e:
+                    logging.error(f"Error on page {page}: {e}")
+                    failed += 1
+                    continue
+                fetched += 1
+                record("pages")
+                if not page_items:
+                    logging.warning(f"No products found on page {page}")
+                    exhausted = True
+                items.extend(page_items)
+    items = items[:max_items]
+    logging.info(f"Scraped {len(items)} pchome products for {zh_keyword} from {fetched} pages ({failed} failed) of {total_pages}")
     return items
 
 if __name__ == "__main__":
     data = scrape_pchome("power bank", "跳繩", max_items=100)
     for item in data:
-        print(item)
\ No newline at end of file
+        print(item)
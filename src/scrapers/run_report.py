@@ -0,0 +1,171 @@
+import os, sys, json, glob, logging, contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+CRAWL_REPORT_DIR = os.getenv("CRAWL_REPORT_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/crawl_reports')))
+# Reports kept on disk; older ones are deleted when a new one is written.
+CRAWL_REPORT_KEEP = int(os.getenv("CRAWL_REPORT_KEEP", "60"))
+# A (site, keyword) regresses when its items drop, or its scrape time grows, by more than these ratios.
+REPORT_ITEM_DROP = float(os.getenv("REPORT_ITEM_DROP", "0.5"))
+REPORT_SLOWDOWN = float(os.getenv("REPORT_SLOWDOWN", "2.0"))
+
+# Counters every job reports; invalid_pages counts pages without real products, like eBay's two placeholder cards.
+COUNTERS = ("pages", "retries", "fallbacks", "invalid_pages")
+
+_job_counters: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("job_counters", default=None)
+
+@contextmanager
+def job_counters():
+    """Collect the counters scrapers record while running one job in this thread."""
+    counters = {name: 0 for name in COUNTERS}
+    token = _job_counters.set(counters)
+    try:
+        yield counters
+    finally:
+        _job_counters.reset(token)
+
+def record(name: str, amount: int = 1):
+    """Add to a counter of the current scrape job, e.g. pages visited or retries; a no-op outside a job."""
+    counters = _job_counters.get()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + amount
+
+def _rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+class RunReport:
+    """Per-(site, keyword) numbers of one crawl, written as JSON so runs can be compared.
+
+    Each job entry holds the scheduler timing and scraper counters, the incremental split of its
+    items, the embedding stats and the OpenSearch writes made for it. Run-level writes, such as
+    loading a rebuild index, are kept under "writes".
+    """
+
+    def __init__(self, mode: str):
+        self.started_at = datetime.now()
+        self.report = {"started_at": self.started_at.isoformat(), "mode": mode, "status": "running", "error": None,
+                       "attempts": 0, "attempt_errors": [], "jobs": [], "writes": [], "totals": {}}
+
+    def start_attempt(self):
+        """Forget the jobs of a failed attempt, since a retry crawls every (site, keyword) again."""
+        self.report["attempts"] += 1
+        self.report["jobs"], self.report["writes"] = [], []
+
+    def attempt_failed(self, error: Exception):
+        self.report["attempt_errors"].append(f"{type(error).__name__}: {error}")
+
+    def add_job(self, job: Dict, counts: Optional[Dict] = None, embedding_stats: Optional[Dict] = None, write: Optional[Dict] = None):
+        entry = {
+            "site": job["site"],
+            "keyword": job["keyword"],
+            "error": job.get("error"),
+            "wait_sec": round(job.get("wait_sec", 0.0), 3),
+            "scrape_sec": round(job.get("duration_sec", 0.0), 3),
+            "items": job.get("items", 0),
+            **{name: job.get(name, 0) for name in COUNTERS},
+            **(counts or {}),
+        }
+        if embedding_stats:
+            entry["embedding"] = {name: embedding_stats[name] for name in ("items", "embedded", "cache_hits", "api_texts", "failed_batches")}
+            entry["embedding"]["sec"] = round(embedding_stats["elapsed_sec"], 6)
+            entry["embedding"]["items_per_sec"] = round(embedding_stats["items_per_sec"], 2)
+        if write:
+            entry["write"] = write
+        self.report["jobs"].append(entry)
+        return entry
+
+    @staticmethod
+    def write_stats(reports: List[Dict], seconds: float) -> Dict:
+        """Summarize the chunk reports of one bulk call."""
+        succeeded = sum(report["succeeded"] for report in reports)
+        return {"actions": sum(report["actions"] for report in reports), "succeeded": succeeded,
+                "failed": sum(report["failed"] for report in reports), "throttled": sum(report["throttled"] for report in reports),
+                "sec": round(seconds, 6), "docs_per_sec": _rate(succeeded, seconds)}
+
+    def add_write(self, name: str, reports: List[Dict], seconds: float):
+        self.report["writes"].append({"name": name, **self.write_stats(reports, seconds)})
+
+    def finish(self, status: str, error: Optional[str] = None, **extra) -> Dict:
+        jobs = self.report["jobs"]
+        writes = [job["write"] for job in jobs if "write" in job] + self.report["writes"]
+        embeddings = [job["embedding"] for job in jobs if "embedding" in job]
+        embedded, embedding_sec = sum(e["embedded"] for e in embeddings), sum(e["sec"] for e in embeddings)
+        written, write_sec = sum(w["succeeded"] for w in writes), sum(w["sec"] for w in writes)
+        totals = {
+            "jobs": len(jobs),
+            "failed_jobs": sum(1 for job in jobs if job["error"]),
+            "empty_jobs": sum(1 for job in jobs if not job["items"]),
+            **{name: sum(job.get(name, 0) for job in jobs) for name in ("items", "scrape_sec") + COUNTERS},
+            "embedded": embedded,
+            "embedding_api_texts": sum(e["api_texts"] for e in embeddings),
+            "embedding_items_per_sec": _rate(embedded, embedding_sec),
+            "written": written,
+            "write_failed": sum(w["failed"] for w in writes),
+            "write_docs_per_sec": _rate(written, write_sec),
+            **extra,
+        }
+        totals["scrape_sec"] = round(totals["scrape_sec"], 3)
+        self.report.update(status=status, error=error, totals=totals, duration_sec=round((datetime.now() - self.started_at).total_seconds(), 3))
+        return self.report
+
+    def save(self, path: str = CRAWL_REPORT_DIR) -> str:
+        os.makedirs(path, exist_ok=True)
+        file = os.path.join(path, f"{self.started_at.strftime('%Y%m%dT%H%M%S')}.json")
+        with open(file + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(self.report, handle, ensure_ascii=False, indent=1)
+        os.replace(file + ".tmp", file)
+        for old in sorted(glob.glob(os.path.join(path, "*.json")))[:-CRAWL_REPORT_KEEP]:
+            os.remove(old)
+        logging.info(f"Crawl report written to {file}")
+        return file
+
+def load_reports(path: str = CRAWL_REPORT_DIR, limit: Optional[int] = None) -> List[Dict]:
+    """Saved reports, oldest first; with limit only the latest ones."""
+    files = sorted(glob.glob(os.path.join(path, "*.json")))
+    reports = []
+    for file in files[-limit:] if limit else files:
+        with open(file, encoding="utf-8") as handle:
+            reports.append(json.load(handle))
+    return reports
+
+def diff_reports(old: Dict, new: Dict, item_drop: float = REPORT_ITEM_DROP, slowdown: float = REPORT_SLOWDOWN) -> List[Dict]:
+    """Per-(site, keyword) changes between two reports, flagging new failures, item drops and slow scrapes."""
+    old_jobs = {(job["site"], job["keyword"]): job for job in old["jobs"]}
+    changes = []
+    for job in new["jobs"]:
+        key = (job["site"], job["keyword"])
+        before = old_jobs.get(key)
+        if before is None:
+            continue
+        flags = []
+        if job["error"] and not before["error"]:
+            flags.append("failed")
+        if job.get("invalid_pages") and not before.get("invalid_pages"):
+            flags.append("invalid_pages")
+        if before["items"] and job["items"] < before["items"] * (1 - item_drop):
+            flags.append("items")
+        if before["scrape_sec"] > 1 and job["scrape_sec"] > before["scrape_sec"] * slowdown:
+            flags.append("slow")
+        changes.append({"site": key[0], "keyword": key[1], "flags": flags,
+                        **{name: (before.get(name, 0), job.get(name, 0)) for name in ("items", "pages", "retries", "invalid_pages", "scrape_sec")}})
+    return changes
+
+def print_diff(old: Dict, new: Dict):
+    print(f"{old['started_at']} -> {new['started_at']}")
+    for name in ("items", "failed_jobs", "empty_jobs", "retries", "invalid_pages", "scrape_sec", "embedding_items_per_sec", "write_docs_per_sec"):
+        print(f"  {name}: {old['totals'].get(name)} -> {new['totals'].get(name)}")
+    for change in diff_reports(old, new):
+        if change["flags"]:
+            print(f"  {change['site']}/{change['keyword']} [{', '.join(change['flags'])}]: "
+                  f"items {change['items'][0]} -> {change['items'][1]}, scrape {change['scrape_sec'][0]:.1f}s -> {change['scrape_sec'][1]:.1f}s, "
+                  f"retries {change['retries'][0]} -> {change['retries'][1]}")
+
+if __name__ == "__main__":
+    reports = load_reports(sys.argv[1] if len(sys.argv) > 1 else CRAWL_REPORT_DIR, limit=2)
+    if len(reports) < 2:
+        print("Need at least two crawl reports to diff")
+    else:
+        print_diff(*reports)
@@ -0,0 +1,80 @@
+import os, logging, time, threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.scrapers.run_report import job_counters
+
+logging.basicConfig(level=logging.INFO)
+
+CRAWL_MAX_WORKERS = int(os.getenv("CRAWL_MAX_WORKERS", "4"))
+SITE_CONCURRENCY = {"ebay": 1, "momo": 1, "pchome": 2}
+SITE_POLITENESS_DELAY = {"ebay": 2.0, "momo": 2.0, "pchome": 0.5}
+
+def default_scrapers() -> Dict[str, Callable[[str, str], List[Dict]]]:
+    """Map each site to a scraper taking (en_keyword, zh_keyword)."""
+    from src.scrapers.ebay import scrape_ebay
+    from src.scrapers.momo import scrape_momo
+    from src.scrapers.pchome import scrape_pchome
+    return {
+        "ebay": lambda en_keyword, zh_keyword: scrape_ebay(en_keyword),
+        "momo": scrape_momo,
+        "pchome": scrape_pchome,
+    }
+
+class _SiteGate:
+    """Space out the job starts of one site by a politeness delay."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.delay
+        if wait:
+            time.sleep(wait)
+
+def _run_job(site: str, en_keyword: str, zh_keyword: str, scraper: Callable, gate: _SiteGate, queued_at: float) -> Tuple[Dict, List[Dict]]:
+    gate.wait()
+    started_at = time.perf_counter()
+    job = {"site": site, "keyword": en_keyword, "wait_sec": started_at - queued_at, "error": None}
+    with job_counters() as counters:
+        try:
+            items = scraper(en_keyword, zh_keyword) or []
+        except Exception as e:
+            logging.error(f"{site} job failed for {zh_keyword}/{en_keyword}: {str(e)}")
+            job["error"] = str(e)
+            items = []
+    job.update(counters)
+    job["duration_sec"] = time.perf_counter() - started_at
+    job["items"] = len(items)
+    logging.info(f"{site}/{en_keyword}: {len(items)} items from {job['pages']} pages in {job['duration_sec']:.1f}s "
+                 f"(waited {job['wait_sec']:.1f}s, {job['retries']} retries)")
+    return job, items
+
+def run_crawl_jobs(keyword_pairs: List[Tuple[str, str]], scrapers: Optional[Dict[str, Callable]] = None,
+                   max_workers: int = CRAWL_MAX_WORKERS, site_concurrency: Optional[Dict[str, int]] = None,
+                   politeness_delay: Optional[Dict[str, float]] = None) -> Iterator[Tuple[Dict, List[Dict]]]:
+    """Run every (site, keyword) scrape and yield (job timing and counters, items) as each job finishes.
+
+    Each site gets its own worker pool sized to its concurrency (capped by max_workers), so a slow
+    site's queued jobs never hold threads another site could use. Closing the generator early
+    cancels the jobs that have not started.
+    """
+    scrapers = scrapers or default_scrapers()
+    site_concurrency = {**SITE_CONCURRENCY, **(site_concurrency or {})}
+    politeness_delay = {**SITE_POLITENESS_DELAY, **(politeness_delay or {})}
+    gates = {site: _SiteGate(politeness_delay.get(site, 0.0)) for site in scrapers}
+    executors = {site: ThreadPoolExecutor(max_workers=max(1, min(site_concurrency.get(site, 1), max_workers)), thread_name_prefix=f"crawl-{site}")
+                 for site in scrapers}
+    try:
+        queued_at = time.perf_counter()
+        futures = [executors[site].submit(_run_job, site, en_keyword, zh_keyword, scrapers[site], gates[site], queued_at)
+                   for en_keyword, zh_keyword in keyword_pairs for site in scrapers]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
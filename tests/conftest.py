@@ -0,0 +1,8 @@
+import os, sys
+
+# Modules import each other both as "opensearch.x" (src on the path) and "src.scrapers.x" (repo root on the path).
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
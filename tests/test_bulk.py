@@ -0,0 +1,91 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from opensearchpy.exceptions import TransportError
+from opensearch import function
+from opensearch.crawl_batch import CrawlBatch
+
+def make_batch(count):
+    items = [{"e_commercesite": "pchome", "name": f"mouse item {i}", "price_twd": 100 + i, "href": f"https://example.com/{i}",
+              "image_url": None, "keyword": "mouse"} for i in range(count)]
+    batch = CrawlBatch.from_items(items, timestamp=datetime.now().isoformat())
+    batch.embeddings = np.random.default_rng(0).standard_normal((count, 8)).astype(np.float32)
+    return batch
+
+def action_of(line):
+    """(op, _id) for an action line of a bulk body, None for a document line."""
+    op, meta = next(iter(line.items()))
+    return (op, meta.get("_id")) if op in ("index", "delete", "update") and isinstance(meta, dict) and "_index" in meta else None
+
+class FakeBulkClient:
+    """Records each bulk body and answers with per-action statuses; throttle maps a document id to how many times to 429 it."""
+
+    def __init__(self, throttle=None, request_errors=()):
+        self.throttle = dict(throttle or {})
+        self.request_errors = list(request_errors)
+        self.requests = []
+
+    def bulk(self, body):
+        self.requests.append(body)
+        if self.request_errors:
+            raise self.request_errors.pop(0)
+        items = []
+        for op, doc_id in filter(None, map(action_of, body)):
+            status = {"index": 201, "delete": 200, "update": 200}[op]
+            if self.throttle.get(doc_id):
+                self.throttle[doc_id] -= 1
+                status = 429
+            items.append({op: {"_id": doc_id, "status": status}})
+        return {"errors": any(next(iter(item.values()))["status"] >= 300 for item in items), "items": items}
+
+    def actions(self, request):
+        return list(filter(None, map(action_of, request)))
+
+@pytest.fixture
+def sleeps(mocker):
+    return mocker.patch("opensearch.function.time.sleep")
+
+def store(mocker, client, batch, **kwargs):
+    mocker.patch.object(function, "get_opensearch_client", return_value=client)
+    return function.bulk_store_and_replace_items_from_opensearch(batch, index_name="test", **kwargs)
+
+def test_actions_are_split_into_chunks(mocker, sleeps):
+    client = FakeBulkClient()
+    batch = make_batch(5)
+    reports = store(mocker, client, batch, replaced_ids=["old-1"], chunk_size=2, concurrency=1)
+    assert [report["actions"] for report in reports] == [2, 2, 2]
+    assert all(report["succeeded"] == report["actions"] and not report["failed"] for report in reports)
+    sent = [action for request in client.requests for action in client.actions(request)]
+    assert sent == [("delete", "old-1")] + [("index", doc_id) for doc_id in batch.columns["ids"].tolist()]
+    # Index actions carry their document on the following line, with the embedding encoded for the profile.
+    document = client.requests[0][2]
+    assert document["name"] == "mouse item 0" and len(document["embedding"]) == 8
+    sleeps.assert_not_called()
+
+def test_only_throttled_actions_are_retried(mocker, sleeps):
+    batch = make_batch(4)
+    throttled_id = batch.columns["ids"][2]
+    client = FakeBulkClient(throttle={throttled_id: 2})
+    reports = store(mocker, client, batch, replaced_ids=[], chunk_size=10, concurrency=1)
+    assert reports[0]["succeeded"] == 4 and reports[0]["throttled"] == 2 and reports[0]["failed"] == 0
+    assert [client.actions(request) for request in client.requests[1:]] == [[("index", throttled_id)]] * 2
+    # The shared throttle backs off before each retry.
+    assert [call.args[0] for call in sleeps.call_args_list] == [0.5, 1.0]
+
+def test_throttled_request_is_retried_until_the_budget_runs_out(mocker, sleeps):
+    batch = make_batch(3)
+    client = FakeBulkClient(request_errors=[TransportError(429, "too_many_requests", {})])
+    reports = store(mocker, client, batch, replaced_ids=[], chunk_size=10, concurrency=1)
+    assert reports[0]["succeeded"] == 3 and reports[0]["throttled"] == 3 and len(client.requests) == 2
+
+    client = FakeBulkClient(throttle={doc_id: 99 for doc_id in batch.columns["ids"].tolist()})
+    reports = store(mocker, client, batch, replaced_ids=[], chunk_size=10, concurrency=1, max_retries=2)
+    assert reports[0]["failed"] == 3 and reports[0]["succeeded"] == 0 and len(client.requests) == 3
+    assert function.failed_document_ids(reports) == set(batch.columns["ids"].tolist())
+
+def test_other_request_errors_fail_the_chunk_without_retry(mocker, sleeps):
+    client = FakeBulkClient(request_errors=[TransportError(400, "mapper_parsing_exception", {})])
+    reports = store(mocker, client, make_batch(3), replaced_ids=["old-1"], chunk_size=10, concurrency=1)
+    assert reports[0]["failed"] == 4 and len(client.requests) == 1
+    # Failed deletes are not reported as documents to write again.
+    assert "old-1" not in function.failed_document_ids(reports) and len(function.failed_document_ids(reports)) == 3
@@ -0,0 +1,48 @@
+from datetime import datetime
+import numpy as np
+from opensearch.crawl_batch import CrawlBatch
+from opensearch.dedupe import SIMILARITY_THRESHOLD, dedupe_items
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+def make_crawl(count, rng, base=None):
+    """Items over two keywords and two sites; about a third are near-copies of an earlier item or of a base vector."""
+    items, vectors = [], []
+    for i in range(count):
+        items.append({"e_commercesite": ["pchome", "momo"][i % 2], "name": f"item {i}", "price_twd": 100 + i,
+                      "href": f"https://example.com/{rng.integers(1 << 30)}", "image_url": None, "keyword": ["mouse", "keyboard"][(i // 2) % 2]})
+        sources = vectors[max(0, i - 8):] + (list(base) if base is not None else [])
+        if sources and rng.random() < 0.35:
+            vectors.append(sources[rng.integers(len(sources))] + rng.normal(0, 0.02, 16))
+        else:
+            vectors.append(rng.standard_normal(16))
+    batch = CrawlBatch.from_items(items, timestamp=datetime.now().isoformat())
+    batch.embeddings = np.asarray(vectors, dtype=np.float32)
+    return batch
+
+def per_item_dedupe(batch, snapshot, exclude_ids):
+    """One item at a time, as the per-document store path compared them."""
+    kept, replaced = [], []
+    vectors, keys = batch.vectors(), list(zip(batch.columns["keywords"].tolist(), batch.columns["sites"].tolist()))
+    for row in range(len(batch)):
+        if not any(keys[other] == keys[row] and cosine(vectors[row], vectors[other]) > SIMILARITY_THRESHOLD for other in kept):
+            kept.append(row)
+    for doc_id, keyword, site, vector in zip(snapshot["ids"].tolist(), snapshot["keywords"].tolist(), snapshot["sites"].tolist(), snapshot["embeddings"]):
+        if doc_id in exclude_ids:
+            continue
+        if any(keys[row] == (keyword, site) and cosine(vectors[row], vector) > SIMILARITY_THRESHOLD for row in kept):
+            replaced.append(doc_id)
+    return kept, replaced
+
+def test_vectorized_dedupe_matches_per_item_comparison():
+    rng = np.random.default_rng(0)
+    previous = make_crawl(60, rng)
+    snapshot = {**previous.columns, "embeddings": previous.vectors()}
+    batch = make_crawl(120, rng, base=previous.vectors())
+    exclude_ids = set(snapshot["ids"][:5].tolist())
+    survivors, replaced_ids = dedupe_items(batch, snapshot, exclude_ids=exclude_ids)
+    kept, replaced = per_item_dedupe(batch, snapshot, exclude_ids)
+    assert 0 < len(kept) < len(batch) and replaced
+    assert survivors.columns["ids"].tolist() == batch.columns["ids"][kept].tolist()
+    assert sorted(replaced_ids) == sorted(replaced)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+import openai, pytest
+from opensearch.embedding import embed_text, embed_texts
+
+def api_error(cls, status):
+    response = SimpleNamespace(status_code=status, headers={}, request=None)
+    return cls(f"status {status}", response=response, body=None)
+
+class FakeEmbeddings:
+    """Embeds each text as [len(text), batch number], raising the queued errors first or for texts listed in fail_on."""
+
+    def __init__(self, errors=(), fail_on=()):
+        self.errors = list(errors)
+        self.fail_on = set(fail_on)
+        self.calls = []
+
+    def create(self, input, model, dimensions=None):
+        self.calls.append(list(input))
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.fail_on & set(input):
+            raise api_error(openai.BadRequestError, 400)
+        rows = [SimpleNamespace(index=i, embedding=[float(len(text)), float(len(self.calls))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=rows[::-1])
+
+def client(**kwargs):
+    return SimpleNamespace(embeddings=FakeEmbeddings(**kwargs))
+
+@pytest.fixture
+def sleeps(mocker):
+    return mocker.patch("opensearch.embedding.time.sleep")
+
+def test_partial_batch_failure_leaves_only_its_slots_empty(sleeps):
+    openai_client = client(fail_on={"bad"})
+    texts = ["a", "bb", "bad", "ccc", "a"]
+    vectors, stats = embed_texts(texts, openai_client=openai_client, model="m", batch_size=2, use_cache=False, dimensions=None)
+    # Duplicates are sent once, so the batches are [a, bb], [bad, ccc]; the second fails without a retry.
+    assert openai_client.embeddings.calls == [["a", "bb"], ["bad", "ccc"]]
+    assert [vector and vector[0] for vector in vectors] == [1.0, 2.0, None, None, 1.0]
+    assert stats["failed_batches"] == 1 and stats["embedded"] == 3 and stats["api_texts"] == 4
+    sleeps.assert_not_called()
+
+def test_transient_errors_are_retried_without_sleeping_after_the_last_attempt(sleeps):
+    openai_client = client(errors=[api_error(openai.RateLimitError, 429), api_error(openai.InternalServerError, 503)])
+    vectors, _ = embed_texts(["a"], openai_client=openai_client, model="m", max_retries=3, use_cache=False, dimensions=None)
+    assert vectors == [[1.0, 3.0]]
+    assert [call.args[0] for call in sleeps.call_args_list] == [1, 2]
+
+    openai_client = client(errors=[api_error(openai.InternalServerError, 500)] * 3)
+    vectors, stats = embed_texts(["a"], openai_client=openai_client, model="m", max_retries=3, use_cache=False, dimensions=None)
+    assert vectors == [None] and stats["failed_batches"] == 1
+    assert len(openai_client.embeddings.calls) == 3 and sleeps.call_count == 4
+
+def test_auth_errors_are_not_retried(sleeps):
+    openai_client = client(errors=[api_error(openai.AuthenticationError, 401)])
+    vectors, _ = embed_texts(["a"], openai_client=openai_client, model="m", max_retries=5, use_cache=False, dimensions=None)
+    assert vectors == [None] and len(openai_client.embeddings.calls) == 1
+    sleeps.assert_not_called()
+
+def test_query_embedding_uses_the_smaller_retry_budget(sleeps, mocker):
+    mocker.patch("opensearch.embedding.get_embedding_cache", return_value=None)
+    openai_client = client(errors=[api_error(openai.RateLimitError, 429)] * 5)
+    with pytest.raises(RuntimeError):
+        embed_text("a", openai_client=openai_client, model="m")
+    assert len(openai_client.embeddings.calls) == 2 and sleeps.call_count == 1
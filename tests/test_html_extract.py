@@ -0,0 +1,36 @@
+import os
+from src.scrapers.ebay import parse_ebay_html, parse_ebay_products
+from src.scrapers.momo import parse_momo_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+def test_parse_momo_html():
+    items = parse_momo_html(read_fixture("momo_search.html"), "bluetooth earphone")
+    # The card without a price is skipped, and relative links are resolved against the search page.
+    assert items == [
+        {"e_commercesite": "momo", "name": "Sony WF-1000XM5 真無線藍牙耳機", "price_twd": 8490,
+         "href": "https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=10001",
+         "image_url": "https://img.momoshop.com.tw/goodsimg/10001.jpg", "keyword": "bluetooth earphone"},
+        {"e_commercesite": "momo", "name": "JLab GO Air POP 藍牙耳機", "price_twd": 690,
+         "href": "https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=10002",
+         "image_url": "https://img.momoshop.com.tw/goodsimg/10002.jpg", "keyword": "bluetooth earphone"},
+    ]
+
+def test_parse_ebay_html_returns_raw_rows():
+    rows = parse_ebay_html(read_fixture("ebay_search.html"), "mouse")
+    assert [row["name"] for row in rows] == ["Shop on eBay", "Logitech M185 Wireless Mouse", "Razer Basilisk V3 Gaming Mouse", "Vintage Ball Mouse"]
+    assert rows[1] == {"name": "Logitech M185 Wireless Mouse", "price": "NT$1,234.00",
+                       "href": "https://www.ebay.com/itm/1001", "image_url": "https://i.ebayimg.com/images/g/1001/s-l225.jpg"}
+    assert rows[3]["image_url"] is None
+
+def test_parse_ebay_products_from_html_rows():
+    items = parse_ebay_products(parse_ebay_html(read_fixture("ebay_search.html"), "mouse"), "mouse")
+    # The "Shop on eBay" placeholder and the unparseable price are skipped; a price range keeps its low end.
+    assert [(item["name"], item["price_twd"]) for item in items] == [
+        ("Logitech M185 Wireless Mouse", 1234), ("Razer Basilisk V3 Gaming Mouse", 900)]
+    assert not any("123456" in item["href"] for item in items)
+    assert items[1]["image_url"] == "https://i.ebayimg.com/images/g/1002/s-l225.jpg"
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import numpy as np
+from opensearch.crawl_batch import CrawlBatch
+from opensearch.dedupe import update_snapshot
+from opensearch.incremental import classify_items, expire_items
+
+def make_items(count, keyword="mouse", site="pchome", price=100):
+    return [{"e_commercesite": site, "name": f"{keyword} item {i}", "price_twd": price + i, "href": f"https://example.com/{site}/{keyword}/{i}",
+             "image_url": None, "keyword": keyword} for i in range(count)]
+
+def make_batch(items, timestamp, seed=0):
+    batch = CrawlBatch.from_items(items, timestamp=timestamp)
+    batch.embeddings = np.random.default_rng(seed).standard_normal((len(items), 8)).astype(np.float32)
+    return batch
+
+def snapshot_of(batch):
+    return {**batch.columns, "embeddings": batch.vectors()}
+
+def test_classify_splits_new_changed_and_unchanged():
+    now = datetime.now().isoformat()
+    snapshot = snapshot_of(make_batch(make_items(3), now))
+    items = make_items(4)
+    items[1]["price_twd"] = 999
+    changes = classify_items(CrawlBatch.from_items(items, timestamp=now), snapshot)
+    assert changes["unchanged"].columns["names"].tolist() == ["mouse item 0", "mouse item 2"]
+    assert changes["changed"].columns["names"].tolist() == ["mouse item 1"]
+    assert changes["new"].columns["names"].tolist() == ["mouse item 3"]
+    # Unchanged rows carry their snapshot embeddings, so they are never re-embedded.
+    np.testing.assert_array_equal(changes["unchanged"].vectors(), snapshot["embeddings"][[0, 2]])
+
+def test_outdated_snapshot_rows_survive_update_and_expire():
+    old = (datetime.now() - timedelta(days=3)).isoformat()
+    now = datetime.now().isoformat()
+    outdated = make_batch(make_items(1, keyword="laptop"), old)
+    snapshot = update_snapshot(snapshot_of(outdated), make_batch(make_items(2), now, seed=1), removed_ids=[])
+    assert len(snapshot["ids"]) == 3
+    trimmed, expired_ids = expire_items(snapshot, days=2)
+    assert expired_ids == outdated.columns["ids"].tolist()
+    assert sorted(trimmed["keywords"].tolist()) == ["mouse", "mouse"]
+
+def patch_crawler(mocker, tmp_path, snapshot, failed_ids=()):
+    """Patch run_crawler's storage around a given snapshot; bulk writes report failed_ids as rejected."""
+    import src.scrapers.main as main
+    bulk = mocker.patch.object(main, "bulk_store_and_replace_items_from_opensearch",
+                               return_value=[{"chunk": 0, "actions": 0, "succeeded": 0, "failed": len(failed_ids), "throttled": 0,
+                                              "failed_ids": list(failed_ids)}])
+    saved = mocker.patch.object(main, "save_snapshot")
+    mocker.patch.object(main, "CRAWL_MODE", "incremental")
+    mocker.patch.object(main, "CRAWL_BATCH_PATH", "")
+    mocker.patch.object(main, "load_keyword_pairs", return_value=[("mouse", "滑鼠")])
+    mocker.patch.object(main, "load_snapshot", return_value=snapshot)
+    mocker.patch.object(main, "create_index_for_opensearch")
+    mocker.patch.object(main, "delete_outdated_items_from_opensearch")
+    mocker.patch.object(main, "build_local_index")
+    mocker.patch.object(main, "embed_items", side_effect=lambda batch, **kwargs: (make_batch(
+        [batch.item(row) for row in range(len(batch))], batch.columns["timestamps"][0] if len(batch) else None), {
+        "items": len(batch), "embedded": len(batch), "cache_hits": 0, "api_texts": len(batch), "failed_batches": 0,
+        "elapsed_sec": 0.0, "items_per_sec": 0.0}))
+    mocker.patch("src.scrapers.run_report.CRAWL_REPORT_DIR", str(tmp_path))
+    mocker.patch("src.scrapers.run_report.RunReport.save")
+    return main, bulk, saved
+
+def test_run_crawler_deletes_expired_documents(mocker, tmp_path):
+    old = (datetime.now() - timedelta(days=3)).isoformat()
+    outdated = make_batch(make_items(1, keyword="laptop"), old)
+    main, bulk, saved = patch_crawler(mocker, tmp_path, snapshot_of(outdated))
+
+    report = main.run_crawler(scrapers={"pchome": lambda en, zh: make_items(2)})
+
+    assert report["status"] == "succeeded"
+    assert report["totals"]["expired"] == 1
+    deletes = [call.kwargs["replaced_ids"] for call in bulk.call_args_list if not len(call.args[0])]
+    assert deletes == [outdated.columns["ids"].tolist()]
+    assert "laptop" not in saved.call_args.args[0]["keywords"].tolist()
+
+def test_failed_writes_are_left_out_of_the_snapshot(mocker, tmp_path):
+    known = make_batch(make_items(2), datetime.now().isoformat())
+    crawled = CrawlBatch.from_items(make_items(3), timestamp=datetime.now().isoformat())
+    # Item 1 is unchanged but its timestamp update 404s; the insert of new item 2 is rejected.
+    failed = crawled.columns["ids"][1:].tolist()
+    main, bulk, saved = patch_crawler(mocker, tmp_path, snapshot_of(known), failed_ids=failed)
+
+    report = main.run_crawler(scrapers={"pchome": lambda en, zh: make_items(3)})
+
+    assert report["status"] == "succeeded" and report["totals"]["stored"] == 0
+    snapshot = saved.call_args.args[0]
+    assert snapshot["ids"].tolist() == crawled.columns["ids"][:1].tolist()
+    # So the next crawl sees both as new and indexes their full documents.
+    changes = classify_items(crawled, snapshot)
+    assert changes["new"].columns["ids"].tolist() == failed
@@ -0,0 +1,24 @@
+import json
+import pytest
+from opensearch.intent import LABELED_QUERIES_PATH, parse_intent
+
+with open(LABELED_QUERIES_PATH, encoding="utf-8") as file:
+    LABELED = json.load(file)
+
+@pytest.mark.parametrize("case", LABELED, ids=[case["query"] for case in LABELED])
+def test_rule_answers_match_labels(case):
+    # None hands the query to the chat model; any answer the rules give must be the labeled one.
+    parsed = parse_intent(case["query"])
+    assert parsed is None or parsed == case["expected"]
+
+def test_rules_cover_prices_and_site_choices():
+    answered = [case["expected"] for case in LABELED if parse_intent(case["query"]) is not None]
+    assert any(expected["price_floor"] != "" and expected["price_ceiling"] != "" for expected in answered)
+    assert any(expected["price_floor"] != "" and expected["price_ceiling"] == "" for expected in answered)
+    assert any(expected["price_ceiling"] != "" and expected["price_floor"] == "" for expected in answered)
+    site_only = [expected for expected in answered if sum(expected[f"{site}_count"] > 0 for site in ("pchome", "ebay", "momo")) == 1]
+    assert site_only and all(max(expected[f"{site}_count"] for site in ("pchome", "ebay", "momo")) == 6 for expected in site_only)
+
+@pytest.mark.parametrize("query", ["不要ebay的藍牙耳機", "除了momo以外的滑鼠", "laptop without touchscreen", "耳機跟滑鼠", "手機殼"])
+def test_negations_and_ambiguous_queries_go_to_the_chat_model(query):
+    assert parse_intent(query) is None
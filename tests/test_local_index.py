@@ -0,0 +1,48 @@
+from datetime import datetime
+import numpy as np
+from opensearch.crawl_batch import CrawlBatch
+from opensearch.local_index import LocalVectorIndex, build_local_index
+
+KEYWORDS = ["mouse", "gaming mouse", "keyboard"]
+SITES = ["pchome", "momo", "ebay"]
+
+def make_snapshot(count=300, dimensions=16, seed=0):
+    rng = np.random.default_rng(seed)
+    items = [{"e_commercesite": SITES[i % 3], "name": f"item {i}", "price_twd": int(rng.integers(100, 5000)),
+              "href": f"https://example.com/{i}", "image_url": None, "keyword": KEYWORDS[(i // 3) % 3]} for i in range(count)]
+    batch = CrawlBatch.from_items(items, timestamp=datetime.now().isoformat())
+    return {**batch.columns, "embeddings": rng.standard_normal((count, dimensions)).astype(np.float32)}
+
+def brute_force(snapshot, vector, site, count, keyword="", price_floor=None, price_ceiling=None):
+    """Score every snapshot row and apply the filters one by one, like the OpenSearch query does."""
+    query = np.asarray(vector) / np.linalg.norm(vector)
+    query_tokens = set(keyword.lower().split())
+    scored = []
+    for row in range(len(snapshot["ids"])):
+        price = snapshot["prices"][row]
+        if snapshot["sites"][row] != site or (price_floor and price < price_floor) or (price_ceiling and price > price_ceiling):
+            continue
+        if keyword and not query_tokens & set(str(snapshot["keywords"][row]).split()):
+            continue
+        embedding = snapshot["embeddings"][row]
+        scored.append((-float(embedding @ query / np.linalg.norm(embedding)), str(snapshot["hrefs"][row])))
+    return [href for _, href in sorted(scored)[:count]]
+
+def test_filtered_pool_search_matches_brute_force(tmp_path):
+    snapshot = make_snapshot()
+    build_local_index(snapshot, path=str(tmp_path))
+    index = LocalVectorIndex(str(tmp_path))
+    vector = np.random.default_rng(1).standard_normal(16).tolist()
+    cases = [("pchome", 5, "", None, None), ("momo", 3, "mouse", None, None), ("ebay", 4, "gaming mouse", 1000, 3000),
+             ("pchome", 10, "keyboard", None, 2000), ("momo", 500, "", 2500, None), ("ebay", 2, "laptop", None, None)]
+    for site, count, keyword, floor, ceiling in cases:
+        hits = index.search(vector, site, count, keyword=keyword, price_floor=floor, price_ceiling=ceiling)
+        assert [hit["href"] for hit in hits] == brute_force(snapshot, vector, site, count, keyword, floor, ceiling)
+
+def test_search_picks_up_a_new_build(tmp_path):
+    build_local_index(make_snapshot(dimensions=8), path=str(tmp_path))
+    index = LocalVectorIndex(str(tmp_path))
+    assert index.available(8)
+    build_local_index(make_snapshot(count=30, dimensions=4, seed=2), path=str(tmp_path))
+    assert index.available(4) and not index.available(8)
+    assert len(index.search([1.0, 0.0, 0.0, 0.0], "pchome", 100)) == 10
@@ -0,0 +1,45 @@
+from src.scrapers.pchome import scrape_pchome
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        if self.data is None:
+            raise RuntimeError("503 from fake pchome")
+
+    def json(self):
+        return self.data
+
+class FakeSession:
+    """Serves page sizes[page - 1] products per page; pages listed in failing answer with an error."""
+
+    def __init__(self, sizes, failing=()):
+        self.sizes = sizes
+        self.failing = set(failing)
+        self.pages = []
+
+    def get(self, url, params, timeout):
+        page = params["page"]
+        self.pages.append(page)
+        if page in self.failing:
+            return FakeResponse(None)
+        prods = [{"Id": f"P{page}-{i}", "name": f"item {page}-{i}", "price": 100 + i, "picB": f"{page}/{i}.jpg"} for i in range(self.sizes[page - 1])]
+        return FakeResponse({"totalPage": len(self.sizes), "prods": prods})
+
+def test_short_later_pages_lead_to_more_pages():
+    session = FakeSession([20] + [5] * 9)
+    items = scrape_pchome("mouse", "滑鼠", max_items=50, session=session)
+    assert len(items) == 50
+    assert len({item["href"] for item in items}) == 50
+
+def test_failed_pages_are_skipped_not_the_end():
+    session = FakeSession([10] * 8, failing={2})
+    items = scrape_pchome("mouse", "滑鼠", max_items=40, session=session)
+    assert len(items) == 40 and 2 in session.pages
+    assert not any(item["href"].startswith("https://24h.pchome.com.tw/prod/P2-") for item in items)
+
+def test_stops_when_total_pages_run_out():
+    session = FakeSession([10, 10, 3])
+    items = scrape_pchome("mouse", "滑鼠", max_items=100, session=session)
+    assert len(items) == 23 and sorted(session.pages) == [1, 2, 3]
@@ -0,0 +1,44 @@
+import threading, time
+from src.scrapers.scheduler import run_crawl_jobs
+
+KEYWORD_PAIRS = [(f"keyword {i}", f"關鍵字 {i}") for i in range(6)]
+NO_DELAY = {"ebay": 0.0, "momo": 0.0, "pchome": 0.0}
+
+def tracking_scrapers(durations):
+    """Scrapers that sleep for their site's duration and record the most jobs of each site seen running at once."""
+    lock = threading.Lock()
+    running = {site: 0 for site in durations}
+    peak = {site: 0 for site in durations}
+    finished = []
+    def make(site):
+        def scrape(en_keyword, zh_keyword):
+            with lock:
+                running[site] += 1
+                peak[site] = max(peak[site], running[site])
+            time.sleep(durations[site])
+            with lock:
+                running[site] -= 1
+                finished.append(site)
+            return [{"name": en_keyword}]
+        return scrape
+    return {site: make(site) for site in durations}, peak, finished
+
+def test_jobs_respect_per_site_concurrency():
+    scrapers, peak, _ = tracking_scrapers({"ebay": 0.02, "momo": 0.02, "pchome": 0.02})
+    results = list(run_crawl_jobs(KEYWORD_PAIRS, scrapers=scrapers, max_workers=8, politeness_delay=NO_DELAY,
+                                  site_concurrency={"ebay": 1, "momo": 1, "pchome": 3}))
+    assert len(results) == 18 and all(job["items"] == 1 for job, _ in results)
+    assert peak == {"ebay": 1, "momo": 1, "pchome": 3}
+
+def test_slow_sites_do_not_starve_fast_ones():
+    scrapers, _, finished = tracking_scrapers({"ebay": 0.1, "momo": 0.1, "pchome": 0.01})
+    list(run_crawl_jobs(KEYWORD_PAIRS, scrapers=scrapers, max_workers=4, politeness_delay=NO_DELAY))
+    # pchome runs on its own workers, so all its jobs finish while ebay and momo are still on their first jobs.
+    assert finished[:6] == ["pchome"] * 6
+
+def test_closing_early_cancels_queued_jobs():
+    scrapers, _, finished = tracking_scrapers({"ebay": 0.05})
+    jobs = run_crawl_jobs(KEYWORD_PAIRS, scrapers=scrapers, politeness_delay=NO_DELAY)
+    next(jobs)
+    jobs.close()
+    assert len(finished) < len(KEYWORD_PAIRS)
@@ -0,0 +1,27 @@
+from opensearch.translation import Translator
+
+GLOSSARY = [("藍牙耳機", "bluetooth earphone"), ("手機", "smartphone"), ("耳機", "earphone"), ("滑鼠", "mouse")]
+
+def make_translator():
+    calls = []
+    def remote(text):
+        calls.append(text)
+        return f"remote:{text}"
+    return Translator(remote, GLOSSARY), calls
+
+def test_whole_glossary_query_is_translated_locally():
+    translator, calls = make_translator()
+    assert translator.local("我想買藍牙耳機推薦") == ("bluetooth earphone", True)
+    assert translator.local("滑鼠 1000元以下") == ("mouse", True)
+    assert calls == []
+
+def test_term_before_accessory_suffix_or_more_chinese_is_not_substituted():
+    translator, _ = make_translator()
+    assert translator.local("手機殼") == ("手機殼", False)
+    assert translator.local("耳機跟滑鼠") == ("耳機跟滑鼠", False)
+
+def test_partly_covered_query_goes_to_remote_unchanged():
+    translator, calls = make_translator()
+    assert translator.translate("手機殼推薦") == "remote:手機殼推薦"
+    assert translator.translate("耳機跟滑鼠") == "remote:耳機跟滑鼠"
+    assert calls == ["手機殼推薦", "耳機跟滑鼠"]